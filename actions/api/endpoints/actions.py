@@ -1,17 +1,15 @@
+import copy
 import logging
 import traceback
 from actions.logic.force_update import ForceUpdate
 from flask_restx import Resource, reqparse
 from flask import request
-from actions.settings import BRIDGE_HOST
 from actions.api.restplus import api
-from actions.logic.db import Notifications, ActionsHistory, NotificationHistory, ActiveAlerts, Statistics, Assign
+from actions.logic.db import BulkAction
 import json
-import requests
 import datetime
-from actions.tools.prometheus_metrics import Prom
-from actions.logic.auth_decorator import token_required
-from actions.logic.auth_decorator import get_user_id_by_token
+from actions.tools.action_metrics import action_metrics
+from actions.logic.auth_decorator import token_required, current_identity
 from actions.logic.user_info import get_user_info, get_user_info_by_id
 
 
@@ -19,27 +17,34 @@ logger = logging.getLogger('default')
 ns = api.namespace('api/v1/actions', description='Actions')
 
 
+def log_request(message: str, username: str, data):
+    """
+    Alert ids of the request at INFO and the full body at DEBUG. Records are formatted later on the shipper
+    thread, the logged values are copies and don't change with the request data.
+    """
+    alert_ids = (data.get('alert_ids') if isinstance(data, dict) else None) or []
+    alert_ids = list(alert_ids) if isinstance(alert_ids, (list, tuple)) else [alert_ids]
+    logger.info(message, username, extra={'event': 'action_request', 'alert_ids': alert_ids, 'count': len(alert_ids)})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, username, extra={'event': 'action_request_body', 'body': copy.deepcopy(data)})
+
+
 @ns.route('/add-comment')
 class ActionComment(Resource):
     @token_required()
+    @action_metrics.timed('Adding comment')
     def post(self):
         """
             Adding comment to alerts list.
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(f"Receive request to add-comment: {username}\nObject ID: {obj_id}\nBody: {json.dumps(data)}")
-            for alert_id in data['alert_ids']:
-                NotificationHistory.add_new_event({'alert_id': alert_id, 'notification_action': 'Adding comment', 'comments': json.dumps({'comment': data['comment'], 'author': username})})
-                ActionsHistory.add_action_to_history_({'name': 'Add comment', 'obj_type': 'alert', 'obj_id': alert_id, 'username': username, 'notes': json.dumps(data['comment'])})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Adding comment',
-                    user_name=username
-                ).inc(1)
+            log_request("Receive request to add-comment: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.add_notification_history('Adding comment', {'comment': data['comment'], 'author': username}, with_output=False)
+                bulk_action.add_actions_history('Add comment', json.dumps(data['comment']))
+            action_metrics.record('Adding comment', username, bulk_action.studios)
             return {"msg": "Comment added."}, 200
         except Exception as err:
             logger.error(msg=f"Can`t add-comment. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -49,25 +54,19 @@ class ActionComment(Resource):
 @ns.route('/add-description')
 class ActionDescription(Resource):
     @token_required()
+    @action_metrics.timed('Add description')
     def post(self):
         """
             Adding description to list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(f"Receive request to add-description: {username}\nobject_id: {obj_id}\nBody: {json.dumps(data)}")
-            for alert_id in data['alert_ids']:
-                Notifications.update_description(alert_id, data['description'])
-                ActionsHistory.add_action_to_history_({'name': 'Change description.', 'obj_type': 'alert', 'obj_id': alert_id, 'username': username, 'notes': json.dumps({'description': data['description']})})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Add description',
-                    user_name=username
-                ).inc(1)
+            log_request("Receive request to add-description: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_notifications({'description': data['description']})
+                bulk_action.add_actions_history('Change description.', json.dumps({'description': data['description']}))
+            action_metrics.record('Add description', username, bulk_action.studios)
             return {"msg": "Data collected"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t add-description. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -77,37 +76,26 @@ class ActionDescription(Resource):
 @ns.route('/resolve')
 class ActionResolve(Resource):
     @token_required()
+    @action_metrics.timed('Resolve alert')
     def post(self):
         """
             Resolving list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(msg=f"Receive request to Resolve alert: {username}\nobject_id: {obj_id}\nBody: {json.dumps(data)}")
-            for alert_id in data['alert_ids']:
-                ActiveAlerts.delete_exist_event(alert_id)
-                Notifications.update_notification_status(alert_id, 0)
-                NotificationHistory.add_new_event({'alert_id': alert_id, 'notification_output': Notifications.current_output(alert_id), 'notification_action': 'Resolve alert', 'comments': json.dumps({'author': username, 'comment': data['comment']})})
-                current_count = Statistics.get_counter(alert_id)
-                if current_count:
-                    Statistics.update_counter(alert_id, {'close': current_count.close + 1})
-                ActionsHistory.add_action_to_history_({'name': 'Resolving alert', 'obj_type': 'alert', 'obj_id': alert_id, 'username': username, 'notes': json.dumps({'description': data['comment']})})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Resolve alert',
-                    user_name=username
-                ).inc(1)
+            log_request("Receive request to Resolve alert: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.delete_active_alerts()
+                bulk_action.update_notifications_status(0)
+                bulk_action.add_notification_history('Resolve alert', {'author': username, 'comment': data['comment']})
+                bulk_action.add_actions_history('Resolving alert', json.dumps({'description': data['comment']}))
+                bulk_action.increment_counter('close')
+            action_metrics.record('Resolve alert', username, bulk_action.studios)
 
             force_update = ForceUpdate(alert_ids=data['alert_ids'])
-            force_update.main()
-            try:
-                result = requests.get(f'http://{BRIDGE_HOST}/api/v1/bridge-actions/update_cache/0', timeout=5).json()
-            except:
-                result = {}
-            logger.info(msg=f"Receive request to update cache - {username}\nobject_id: {obj_id}\nBody: {json.dumps(result)}")
+            # Bridge cache is refreshed by the dispatcher after the force update
+            force_update.main(update_cache=True)
             return {"msg": "Alerts resolved."}, 200
         except Exception as err:
             logger.error(msg=f"Can`t resolve alert. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -122,12 +110,9 @@ class ActionJira(Resource):
             Create Jira for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(msg=f"Receive request to create JIRA: {username}\nobject_id: {obj_id}\nBody: {json.dumps(data)}")
+            log_request("Receive request to create JIRA: %s", username, data)
             return {"msg": "Data collected"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t create JIRA. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -137,13 +122,13 @@ class ActionJira(Resource):
 @ns.route('/snooze')
 class ActionSnooze(Resource):
     @token_required()
+    @action_metrics.timed('Snooze alert')
     def post(self):
         """
             Snoozing list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
             user_info = get_user_info(username)
 
             parser = reqparse.RequestParser(bundle_errors=True)
@@ -156,45 +141,31 @@ class ActionSnooze(Resource):
             parser.add_argument('sticky_output', type=int, required=True, location='json',
                                 help='Disable snooze once alert changed its value in output. False: 0, True: 1')
             data = parser.parse_args()
-            logger.info(msg=f"Received request to snooze alert - {username}\nBody: {json.dumps(data)}")
+            log_request("Received request to snooze alert: %s", username, data)
             action_ts = datetime.datetime.strptime(data['action_ts'], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")
 
-            for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id, {
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({
                     'snooze_expire_ts': action_ts,
                     'handle_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     'action_by': json.dumps(user_info)
                 })
-                Notifications.update_exist_event(alert_id, {'snooze_expire_ts': action_ts,
-                                                            'sticky': (2 if data['sticky_severity'] else 0) +
-                                                                      (3 if data['sticky_output'] else 0),
-                                                            'action_by': json.dumps(user_info)
-                                                            }
-                                                 )
-                NotificationHistory.add_new_event({'alert_id': alert_id,
-                                                   'notification_output': Notifications.current_output(alert_id),
-                                                   'notification_action': 'Snooze alert',
-                                                   'comments': json.dumps({
-                                                       'author': username,
-                                                       'comment': data['comment'],
-                                                       'till': action_ts})
-                                                   })
-                ActionsHistory.add_action_to_history_({
-                    'name': 'Snooze alert',
-                    'obj_type': 'alert',
-                    'obj_id': alert_id,
-                    'username': username,
-                    'notes': json.dumps({'description': data['comment']})
+                bulk_action.update_notifications({
+                    'snooze_expire_ts': action_ts,
+                    'sticky': (2 if data['sticky_severity'] else 0) + (3 if data['sticky_output'] else 0),
+                    'action_by': json.dumps(user_info)
+                })
+                bulk_action.add_notification_history('Snooze alert', {
+                    'author': username,
+                    'comment': data['comment'],
+                    'till': action_ts
                 })
-                current_count = Statistics.get_counter(alert_id)
-                if current_count:
-                    Statistics.update_counter(alert_id, {'snooze': current_count.snooze + 1})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Snooze alert',
-                    user_name=username
-                ).inc(1)
-                logger.info(msg=f"Alert was snoozed: {alert_id}. Username: {username}")
+                bulk_action.add_actions_history('Snooze alert', json.dumps({'description': data['comment']}))
+                bulk_action.increment_counter('snooze')
+
+            action_metrics.record('Snooze alert', username, bulk_action.studios)
+            for alert_id in data['alert_ids']:
+                logger.info("Alert was snoozed: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
 
             force_update = ForceUpdate(alert_ids=data['alert_ids'])
             force_update.main()
@@ -207,41 +178,27 @@ class ActionSnooze(Resource):
 @ns.route('/cancel-snooze')
 class ActionCancelSnooze(Resource):
     @token_required()
+    @action_metrics.timed('Cancel snooze')
     def post(self):
         """
             Cancel snoozing for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
             parser.add_argument('comment', type=str, required=True, location='json', default='', help='Reason of snooze.')
             data = parser.parse_args()
-            logger.info(msg=f"Receive request to cancel snooze. User: {username}\nBody: {json.dumps(data)}")
+            log_request("Receive request to cancel snooze. User: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({'snooze_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+                bulk_action.update_notifications({'snooze_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+                bulk_action.add_notification_history('Cancel snooze', {'author': username, 'comment': data['comment']})
+                bulk_action.add_actions_history('Cancel snooze', json.dumps({'description': data['comment']}))
+            action_metrics.record('Cancel snooze', username, bulk_action.studios)
             for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id,
-                                                {'snooze_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-                Notifications.update_exist_event(alert_id,
-                                                 {'snooze_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-                NotificationHistory.add_new_event({'alert_id': alert_id,
-                                                   'notification_output': Notifications.current_output(alert_id),
-                                                   'notification_action': 'Cancel snooze',
-                                                   'comments': json.dumps({'author': username,
-                                                                           'comment': data['comment']
-                                                                           })
-                                                   })
-                ActionsHistory.add_action_to_history_({'name': 'Cancel snooze', 'obj_type': 'alert',
-                                                       'obj_id': alert_id, 'username': username,
-                                                       'notes': json.dumps({'description': data['comment']})
-                                                       })
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Cancel snooze',
-                    user_name=username
-                ).inc(1)
-                logger.info(msg=f"Snooze was canceled: {alert_id}. Username: {username}")
+                logger.info("Snooze was canceled: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
             return {"msg": "Snooze canceled"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t cancel snooze for alert. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -251,13 +208,13 @@ class ActionCancelSnooze(Resource):
 @ns.route('/handle')
 class ActionHandle(Resource):
     @token_required()
+    @action_metrics.timed('Handle alert')
     def post(self):
         """
             Handling list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
@@ -265,36 +222,22 @@ class ActionHandle(Resource):
             parser.add_argument('assign_to', type=str, required=True, location='json', help='Assign to')
 
             data = parser.parse_args()
-            logger.info(msg=f"Receive request to handle alert - {username}\nBody: {json.dumps(data)}")
+            log_request("Receive request to handle alert: %s", username, data)
             action_ts = datetime.datetime.strptime(data['action_ts'], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")
             user_info = get_user_info_by_id(int(data['assign_to']))
 
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({
+                    'handle_expire_ts': action_ts,
+                    'assigned_to': json.dumps(user_info)
+                })
+                bulk_action.update_notifications({'assigned_to': json.dumps(user_info)})
+                bulk_action.add_notification_history('Handle alert', {'author': username, 'till': action_ts})
+                bulk_action.add_actions_history('Handle alert', f'Handled till: {action_ts}')
+
+            action_metrics.record('Handle alert', username, bulk_action.studios)
             for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(
-                    event_id=alert_id,
-                    data={
-                        'handle_expire_ts': action_ts,
-                        'assigned_to': json.dumps(user_info)
-                    }
-                )
-
-                Notifications.update_exist_event(alert_id, {'assigned_to': json.dumps(user_info)})
-
-                NotificationHistory.add_new_event({'alert_id': alert_id,
-                                                   'notification_output': Notifications.current_output(alert_id),
-                                                   'notification_action': 'Handle alert',
-                                                   'comments': json.dumps({
-                                                       'author': username, 'till': action_ts})})
-                ActionsHistory.add_action_to_history_({
-                    'name': 'Handle alert', 'obj_type': 'alert', 'obj_id': alert_id,
-                    'username': username,
-                    'notes': f'Handled till: {action_ts}'})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Handle alert',
-                    user_name=username
-                ).inc(1)
-                logger.info(msg=f"Alert was handled: {alert_id}. Username: {username}")
+                logger.info("Alert was handled: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
 
             force_update = ForceUpdate(alert_ids=data['alert_ids'])
             force_update.main()
@@ -308,34 +251,26 @@ class ActionHandle(Resource):
 @ns.route('/cancel-handle')
 class ActionCancelHandle(Resource):
     @token_required()
+    @action_metrics.timed('Cancel handling')
     def post(self):
         """
             Cancel handling for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json',
                                 help='List of alerts to cancel handle.')
             data = parser.parse_args()
-            logger.info(msg=f"Receive request to cancel handle for alert: {username}\nBody{json.dumps(data)}")
+            log_request("Receive request to cancel handle for alert: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({'handle_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+                bulk_action.add_notification_history('Cancel handling', {'author': username})
+                bulk_action.add_actions_history('Cancel handling', '')
+            action_metrics.record('Cancel handling', username, bulk_action.studios)
             for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id,
-                                                {'handle_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-                NotificationHistory.add_new_event({'alert_id': alert_id,
-                                                   'notification_output': Notifications.current_output(alert_id),
-                                                   'notification_action': 'Cancel handling',
-                                                   'comments': json.dumps({'author': username})})
-                ActionsHistory.add_action_to_history_({'name': 'Cancel handling', 'obj_type': 'alert',
-                                                       'obj_id': alert_id, 'username': username, 'notes': ''})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Cancel handling',
-                    user_name=username
-                ).inc(1)
-                logger.info(msg=f"Cancel handling: {alert_id}. Username: {username}")
+                logger.info("Cancel handling: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
             return {"msg": "Handling canceled"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t cancel handle for alert. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -345,56 +280,33 @@ class ActionCancelHandle(Resource):
 @ns.route('/acknowledge')
 class ActionAcknowledge(Resource):
     @token_required()
+    @action_metrics.timed('Acknowledge alert')
     def post(self):
         """
             Acknowledging list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
             user_info = get_user_info(username)
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
             parser.add_argument('comment', type=str, required=True, location='json', default='', help='Reason of acknowledge.')
             data = parser.parse_args()
-            logger.info(f"Receive request to acknowledge alert - {username}\nBody: {json.dumps(data)}")
-            for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id, {
+            log_request("Receive request to acknowledge alert: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({
                     'acknowledged': 1,
                     'handle_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     'action_by': json.dumps(user_info)
                 })
+                bulk_action.add_notification_history('Acknowledge', {'author': username, 'comment': data['comment']})
+                bulk_action.add_actions_history('Acknowledge alert', json.dumps({'description': data['comment']}))
+                bulk_action.increment_counter('acknowledge')
 
-                NotificationHistory.add_new_event(
-                    {
-                        'alert_id': alert_id,
-                        'notification_output': Notifications.current_output(alert_id),
-                        'notification_action': 'Acknowledge',
-                        'comments': json.dumps({'author': username, 'comment': data['comment']})
-                    }
-                )
-
-                ActionsHistory.add_action_to_history_(
-                    {
-                        'name': 'Acknowledge alert',
-                        'obj_type': 'alert',
-                        'obj_id': alert_id,
-                        'username': username,
-                        'notes': json.dumps({'description': data['comment']})
-                    }
-                )
-
-                current_count = Statistics.get_counter(alert_id)
-                if current_count:
-                    Statistics.update_counter(alert_id, {'acknowledge': current_count.acknowledge + 1})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Acknowledge alert',
-                    user_name=username
-                ).inc(1)
-
-                logger.info(msg=f"Alert acknowledged: {alert_id}. Username: {username}")
+            action_metrics.record('Acknowledge alert', username, bulk_action.studios)
+            for alert_id in data['alert_ids']:
+                logger.info("Alert acknowledged: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
 
             force_update = ForceUpdate(alert_ids=data['alert_ids'])
             force_update.main()
@@ -408,44 +320,26 @@ class ActionAcknowledge(Resource):
 @ns.route('/cancel-acknowledge')
 class ActionCancelAcknowledge(Resource):
     @token_required()
+    @action_metrics.timed('Cancel acknowledge')
     def post(self):
         """
             Cancel acknowledging for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
             parser.add_argument('comment', type=str, required=True, location='json', default='', help='Reason of acknowledge.')
             data = parser.parse_args()
-            logger.info(f"Receive request to cancel acknowledge - {username}\nBody: {json.dumps(data)}")
+            log_request("Receive request to cancel acknowledge: %s", username, data)
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({'acknowledged': 0})
+                bulk_action.add_notification_history('Cancel acknowledge', {'author': username, 'comment': data['comment']})
+                bulk_action.add_actions_history('Cancel acknowledge', json.dumps({'description': data['comment']}))
+            action_metrics.record('Cancel acknowledge', username, bulk_action.studios)
             for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id, {'acknowledged': 0})
-                NotificationHistory.add_new_event(
-                    {
-                        'alert_id': alert_id,
-                        'notification_output': Notifications.current_output(alert_id),
-                        'notification_action': 'Cancel acknowledge',
-                        'comments': json.dumps({'author': username, 'comment': data['comment']})
-                    }
-                )
-                ActionsHistory.add_action_to_history_(
-                    {
-                        'name': 'Cancel acknowledge',
-                        'obj_type': 'alert',
-                        'obj_id': alert_id,
-                        'username': username,
-                        'notes': json.dumps({'description': data['comment']})
-                    }
-                )
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Cancel acknowledge',
-                    user_name=username
-                ).inc(1)
-                logger.info(msg=f"Cancel alert acknowledge: {alert_id}. Username: {username}")
+                logger.info("Cancel alert acknowledge: %s. Username: %s", alert_id, username, extra={'event': 'action_done'})
             return {"msg": "Acknowledge canceled"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t cancel acknowledge for alert. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -460,12 +354,9 @@ class ActionDowntime(Resource):
             Downtime list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(f"Receive request to downtime alert - {username}\nObject_id: {obj_id}\nBody: {json.dumps(data)}")
+            log_request("Receive request to downtime alert: %s", username, data)
 
             return {"msg": "Data collected"}, 200
         except Exception as err:
@@ -481,12 +372,9 @@ class ActionCancelDowntime(Resource):
             Cancelling downtime for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(f"Receive request to cancel downtime alert - {username}\nObject_id: {obj_id}\nBody: {json.dumps(data)}")
+            log_request("Receive request to cancel downtime alert: %s", username, data)
 
             return {"msg": "Data collected"}, 200
         except Exception as err:
@@ -497,13 +385,13 @@ class ActionCancelDowntime(Resource):
 @ns.route('/assign')
 class ActionAssign(Resource):
     @token_required()
+    @action_metrics.timed('Assign alert')
     def post(self):
         """
             Assign list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
@@ -519,60 +407,39 @@ class ActionAssign(Resource):
             parser.add_argument('sticky_output', type=int, required=True, location='json', help='Disable assign once alert changed its value in output. False: 0, True: 1')
             data = parser.parse_args()
 
-            logger.info(f"Receive request to assign alert - {username}\nBody: {json.dumps(data)}")
+            log_request("Receive request to assign alert: %s", username, data)
 
-            for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id, {
+            time_to = datetime.datetime.strptime(data['time_to'], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")
+            body = {
+                'notification_type': data['notification_type'],
+                'notification_fields': json.dumps(data['notification_fields']),
+                'description': data['description'],
+                'resubmit': data['resubmit'],
+                'sticky': (2 if data['sticky_severity'] else 0) + (3 if data['sticky_output'] else 0),
+                'recipient_id': '',
+                'time_to': time_to}
+
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({
                     'assign_status': 1,
                     'handle_expire_ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 })
-                Notifications.update_exist_event(alert_id, {'assign_status': 1})
-                current_assign = Assign.obj_exist(alert_id)
-                if current_assign:
-                    current_assign.delete_from_db()
-                body = {
-                    'alert_id': alert_id,
-                    'notification_type': data['notification_type'],
-                    'notification_fields': json.dumps(data['notification_fields']),
-                    'description': data['description'],
-                    'resubmit': data['resubmit'],
-                    'sticky': (2 if data['sticky_severity'] else 0) + (3 if data['sticky_output'] else 0),
-                    'recipient_id': '',
-                    'time_to': datetime.datetime.strptime(data['time_to'], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")}
-                Assign.add_new_event(body)
-                description = f"{data['description']}"
-                NotificationHistory.add_new_event(
-                    {
-                        'alert_id': alert_id,
-                        'notification_output': Notifications.current_output(alert_id),
-                        'notification_action': 'Assign',
-                        'comments': json.dumps({'author': username, 'comment': description, 'till': datetime.datetime.strptime(data['time_to'], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S")})
-                    }
-                )
-                ActionsHistory.add_action_to_history_(
-                    {
-                        'name': 'Assign alert',
-                        'obj_type': 'alert',
-                        'obj_id': alert_id,
-                        'username': username,
-                        'notes': json.dumps(body)
-                     }
-                )
-                current_count = Statistics.get_counter(alert_id)
-                if current_count:
-                    Statistics.update_counter(alert_id, {'assign': current_count.assign + 1})
-                Prom.notification_statistics_by_alert_name.labels(
-                    alert_id=alert_id,
-                    event_name='Assign alert',
-                    user_name=username
-                ).inc(1)
-
-                logger.info(msg=f"Alert assign: {alert_id}. Username: {username}")
-
-                force_update = ForceUpdate(alert_ids=data['alert_ids'])
-                force_update.main()
-
-                return {"msg": "Alert assigned."}, 200
+                bulk_action.update_notifications({'assign_status': 1})
+                bulk_action.replace_assign(body)
+                bulk_action.add_notification_history('Assign', {'author': username, 'comment': f"{data['description']}", 'till': time_to})
+                bulk_action.add_actions_history('Assign alert', {
+                    alert_id: json.dumps({'alert_id': alert_id, **body}) for alert_id in bulk_action.alert_ids
+                })
+                bulk_action.increment_counter('assign')
+
+            action_metrics.record('Assign alert', username, bulk_action.studios)
+
+            logger.info("Alerts assign: %s. Username: %s", data['alert_ids'], username, extra={'event': 'action_done'})
+
+            force_update = ForceUpdate(alert_ids=data['alert_ids'])
+            force_update.main()
+
+            return {"msg": "Alert assigned."}, 200
         except Exception as err:
             logger.error(msg=f"Can`t assign alert. Error: {err}\nTrace: {traceback.format_exc()}")
             return {"msg": f"Can`t assign alert. Error - {err}"}, 500
@@ -581,45 +448,29 @@ class ActionAssign(Resource):
 @ns.route('/cancel-assign')
 class ActionAssign(Resource):
     @token_required()
+    @action_metrics.timed('Cancel assign')
     def post(self):
         """
             Cancel assigning for list of alerts
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
+            username = current_identity.username
 
             parser = reqparse.RequestParser(bundle_errors=True)
             parser.add_argument('alert_ids', type=list, required=True, location='json', help='List of alerts to snooze.')
             parser.add_argument('comment', type=str, required=True, location='json', default='', help='Comment.')
             data = parser.parse_args()
-            logger.info(f"Receive request to cancel assign: {username}\n Body: {json.dumps(data)}")
-
-            for alert_id in data['alert_ids']:
-                ActiveAlerts.update_exist_event(alert_id, {'assign_status': 0})
-                Notifications.update_exist_event(alert_id, {'assign_status': 0})
-                current_assign = Assign.obj_exist(alert_id)
-                if current_assign:
-                    current_assign.delete_from_db()
-                    NotificationHistory.add_new_event(
-                        {
-                            'alert_id': alert_id,
-                            'notification_output': Notifications.current_output(alert_id),
-                            'notification_action': 'Cancel assign',
-                            'comments': json.dumps({'author': username, 'comment': data['comment']})
-                        }
-                    )
-                    ActionsHistory.add_action_to_history_(
-                        {
-                            'name': 'Cancel assign',
-                            'obj_type': 'alert',
-                            'obj_id': alert_id,
-                            'username': username,
-                            'notes': json.dumps({'description': data['comment']})
-                         }
-                    )
-                    logger.debug(msg=f"Cancel assign: {alert_id}. Username: {username}")
-                    return {"msg": "Cancel assign."}, 200
+            log_request("Receive request to cancel assign: %s", username, data)
+
+            with BulkAction(data['alert_ids'], username) as bulk_action:
+                bulk_action.update_active_alerts({'assign_status': 0})
+                bulk_action.update_notifications({'assign_status': 0})
+                assigned_ids = bulk_action.delete_assign()
+                if assigned_ids:
+                    bulk_action.add_notification_history('Cancel assign', {'author': username, 'comment': data['comment']}, alert_ids=assigned_ids)
+                    bulk_action.add_actions_history('Cancel assign', json.dumps({'description': data['comment']}), alert_ids=assigned_ids)
+            logger.debug("Cancel assign: %s. Username: %s", assigned_ids, username, extra={'event': 'action_done'})
+            return {"msg": "Cancel assign."}, 200
         except Exception as err:
             logger.error(msg=f"Can`t cancel assign alert. Error: {err}\nTrace: {traceback.format_exc()}")
             return {"msg": f"Can`t cancel assign alert. Error - {err}"}, 500
@@ -633,12 +484,9 @@ class RecheckAction(Resource):
             Recheck object with specified id.
         """
         try:
-            auth_token = request.headers.get('AuthToken')
-            username = get_user_id_by_token(auth_token)
-
-            obj_id = []
+            username = current_identity.username
             data = request.json
-            logger.info(f"Receive request to recheck action - {username}\nBody: {json.dumps(data)}\nObject_id: {obj_id}")
+            log_request("Receive request to recheck action: %s", username, data)
             return {"msg": "Data collected"}, 200
         except Exception as err:
             logger.error(msg=f"Can`t recheck action. Error: {err}\nTrace: {traceback.format_exc()}")
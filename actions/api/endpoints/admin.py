@@ -0,0 +1,52 @@
+import logging
+import traceback
+from flask_restx import Resource, reqparse
+from actions.api.restplus import api
+from actions.logic.auth_decorator import token_required, current_identity
+from actions.tools.db_instrumentation import slow_queries
+import actions.settings as settings
+
+logger = logging.getLogger('default')
+ns = api.namespace('api/v1/admin', description='Service diagnostics')
+
+
+def forbidden():
+    if current_identity.username not in settings.ADMIN_USERS:
+        return {"msg": "Admin endpoints are not allowed for the user"}, 403
+    return None
+
+
+@ns.route('/slow-queries')
+class SlowQueries(Resource):
+    @token_required()
+    def get(self):
+        """
+        Latest statements slower than DB_SLOW_QUERY_SECONDS, newest first.
+        Every process keeps its own buffer, with gunicorn the response shows the worker which served it.
+        """
+        error = forbidden()
+        if error:
+            return error
+        try:
+            parser = reqparse.RequestParser()
+            parser.add_argument('limit', type=int, default=50, location='args')
+            parser.add_argument('min_duration', type=float, default=0, location='args')
+            data = parser.parse_args()
+            return {
+                "threshold_seconds": settings.DB_SLOW_QUERY_SECONDS,
+                "queries": slow_queries.entries(limit=data['limit'], min_duration=data['min_duration'])
+            }, 200
+        except Exception as err:
+            logger.error(msg=f"Can`t collect slow queries. Error: {err}\nTrace: {traceback.format_exc()}")
+            return {"msg": f"Can`t collect slow queries. Error - {err}"}, 500
+
+    @token_required()
+    def delete(self):
+        """
+        Clears slow queries of the process
+        """
+        error = forbidden()
+        if error:
+            return error
+        slow_queries.clear()
+        return {"msg": "Slow queries cleared"}, 200
@@ -1,17 +1,36 @@
 import logging
-from flask_restx import Resource, reqparse
+from flask_restx import Resource, reqparse, inputs
 from actions.api.restplus import api
 from flask_jwt_extended import get_jwt_identity
-from actions.logic.db import Notifications, Procedures, Statistics, NotificationHistory, UsersDB, ActionsHistory, Assign
+from actions.logic.db import Notifications, Procedures, Statistics, NotificationHistory, UsersDB, ActionsHistory
 import json
 import traceback
 from actions.logic.auth_decorator import token_required
-from actions.logic.scenarios import get_scenario_by_id
+from actions.logic.scenarios import get_scenario_by_id, get_scenarios_by_ids
 
 logger = logging.getLogger('default')
 ns = api.namespace('api/v1/notifications', description='Alert details and history.')
 
 
+def add_procedures(notifications: list):
+    """
+    Adds notification_procedure to every notification, scenarios are fetched once per procedure_id
+    """
+    scenarios = get_scenarios_by_ids([notification['procedure_id'] for notification in notifications])
+    for notification in notifications:
+        notification['notification_procedure'] = scenarios.get(notification['procedure_id']) or {
+            "procedure_id": 1,
+            "procedure_details": {}
+        }
+    return notifications
+
+
+def active_notifications_parser():
+    parser = reqparse.RequestParser()
+    parser.add_argument('with_procedure', type=inputs.boolean, default=False, location='args')
+    return parser
+
+
 @ns.route('/notification-details-short/<obj_id>')
 class NotificationSimple(Resource):
     @token_required()
@@ -41,10 +60,9 @@ class NotificationDetails(Resource):
         Notification details for specific ID
         """
         try:
-            alert = Notifications.obj_exist(obj_id)
+            alert_details = Notifications.details(obj_id)
 
-            if alert:
-                alert_details = alert.json_self()
+            if alert_details:
                 procedure_id = alert_details['procedure_id']
                 procedure = get_scenario_by_id(scenario_id=procedure_id)
 
@@ -56,20 +74,7 @@ class NotificationDetails(Resource):
                         "procedure_id": 1,
                         "procedure_details": {}
                     }
-
-                if alert_details['assign_status'] == 1:
-                    assigned = Assign.obj_exist(obj_id)
-                    if assigned:
-                        alert_details['assigned'] = assigned.json()
-                    else:
-                        alert_details['assigned'] = {}
-                        logger.error(msg=f"Assigned row is not found in assign table for alert_id: {obj_id}")
-                else:
-                    alert_details['assigned'] = {}
-                alert_details['history'] = {
-                    "statistics": Statistics.statistic(obj_id),
-                    "body": NotificationHistory.history(obj_id)
-                }
+                alert_details['history'] = NotificationHistory.cached_history(obj_id)
                 return {'msg': alert_details}, 200
             else:
                 return {'msg': "Object id with specified id is not found."}, 404
@@ -86,11 +91,10 @@ class NotificationDetailsMain(Resource):
         Notification details for specific ID without history
         """
         try:
-            alert = Notifications.obj_exist(obj_id)
+            alert_details = Notifications.details(obj_id)
             # active_alerts = ActiveAlerts.obj_exist(obj_id)
 
-            if alert:
-                alert_details = alert.json_self()
+            if alert_details:
                 alert_details['notification_state'] = alert_details['notification_status']
 
                 procedure_id = alert_details['procedure_id']
@@ -105,15 +109,6 @@ class NotificationDetailsMain(Resource):
                         "procedure_details": {}
                     }
 
-                if alert_details['assign_status'] == 1:
-                    assigned = Assign.obj_exist(obj_id)
-                    if assigned:
-                        alert_details['assigned'] = assigned.json()
-                    else:
-                        alert_details['assigned'] = {}
-                        logger.error(msg=f"Assigned row is not found in assign table for alert_id: {obj_id}")
-                else:
-                    alert_details['assigned'] = {}
                 return {'msg': alert_details}, 200
             else:
                 return {'msg': "Object id with specified id is not found."}, 404
@@ -128,17 +123,24 @@ class NotificationDetailsHistory(Resource):
     def get(self, obj_id):
         """
         Notification history for specific ID
+        Use lazy_output=true to skip notification_output of events, it can be loaded later by event_id
         """
         try:
-            alert = Notifications.obj_exist(obj_id)
+            parser = reqparse.RequestParser()
+            parser.add_argument('lazy_output', type=inputs.boolean, default=False, location='args')
+            data = parser.parse_args()
+            alert = Notifications.details(obj_id)
 
             if alert:
-                alert_history = {
-                    "history": {
-                        "statistics": Statistics.statistic(obj_id),
-                        "body": NotificationHistory.history(obj_id)
+                if data['lazy_output']:
+                    alert_history = {
+                        "history": {
+                            "statistics": Statistics.statistic(obj_id),
+                            "body": NotificationHistory.history(obj_id, with_output=False)
+                        }
                     }
-                }
+                else:
+                    alert_history = {"history": NotificationHistory.cached_history(obj_id)}
                 return {'msg': alert_history}, 200
             else:
                 return {'msg': "Object id with specified id is not found."}, 404
@@ -147,6 +149,25 @@ class NotificationDetailsHistory(Resource):
             return {"msg": f"Failed request. Error - {err}"}, 500
 
 
+@ns.route('/notification-history-output/<event_id>')
+class NotificationHistoryOutput(Resource):
+    @token_required()
+    def get(self, event_id):
+        """
+        Output of specific history event
+        """
+        try:
+            notification_output = NotificationHistory.event_output(event_id)
+
+            if notification_output is not None:
+                return {'msg': {"event_id": int(event_id), "notification_output": notification_output}}, 200
+            else:
+                return {'msg': "History event with specified id is not found."}, 404
+        except Exception as err:
+            logger.error(msg=f"Failed request. Error: {err}\nTrace: {traceback.format_exc()}")
+            return {"msg": f"Failed request. Error - {err}"}, 500
+
+
 @ns.route('/assign-procedure-to-notification')
 class AssignProcedureToAlert(Resource):
     @token_required()
@@ -163,7 +184,7 @@ class AssignProcedureToAlert(Resource):
             user_id = UsersDB.find_user_id_by_username(user_name)
             data = parser.parse_args()
             obj_id = data['notification_id']
-            logger.info(f"Request body: {json.dumps(data)}")
+            logger.info("Request body", extra={'event': 'alerts_request', 'body': data})
             object_ = Notifications.obj_exist(obj_id)
             if object_:
                 procedure = Procedures.obj_exist(data['procedure_id'])
@@ -171,7 +192,7 @@ class AssignProcedureToAlert(Resource):
                     object_.procedure_id = data['procedure_id']
                     object_.save_to_db()
                     ActionsHistory.add_action_to_history("assign procedure to alert", "alerts", obj_id, user_name, user_name, json.dumps({'Data': data}))
-                    logger.info(msg=f"Request body: {json.dumps(data)}")
+                    logger.info("Request body", extra={'event': 'alerts_request', 'body': data})
                     return {"msg": procedure.json_self()}, 200
                 else:
                     logger.error(msg=f"The procedure doesn't exist. Request body: {json.dumps(data)}")
@@ -190,9 +211,13 @@ class ActiveNotificationsForSource(Resource):
     def get(self, source):
         """
         Rerurn list of notifications assigned to the source
+        Use with_procedure=true to add notification_procedure to every notification
         """
         try:
+            data = active_notifications_parser().parse_args()
             notifications = Notifications.active_notifications_for_source(source)
+            if data['with_procedure']:
+                add_procedures(notifications)
             return notifications, 200
         except Exception as err:
             logger.error(msg=f"Failed request. Error: {err}\nTrace: {traceback.format_exc()}")
@@ -205,9 +230,13 @@ class ActiveNotificationsForObject(Resource):
     def get(self, source_object):
         """
         Rerurn list of notifications assigned to the object
+        Use with_procedure=true to add notification_procedure to every notification
         """
         try:
+            data = active_notifications_parser().parse_args()
             notifications = Notifications.active_notifications_for_object(source_object)
+            if data['with_procedure']:
+                add_procedures(notifications)
             return notifications, 200
         except Exception as err:
             logger.error(msg=f"Failed request. Error: {err}\nTrace: {traceback.format_exc()}")
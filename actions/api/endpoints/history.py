@@ -3,7 +3,7 @@ from flask_restx import Resource, reqparse
 from actions.api.restplus import api
 from actions.logic.db import NotificationHistory, Notifications
 from actions.logic.auth_decorator import token_required
-from flask import request
+from flask import request, Response, stream_with_context
 import traceback
 
 
@@ -29,13 +29,18 @@ class History(Resource):
                 "object": "",
                 "from": "",
                 "to": "",
-                "scenario_id": ""
+                "scenario_id": "",
+                "page_size": 100,
+                "cursor": "",
+                "lightweight": false
             }
             ```
+            "page_size", "cursor" and "lightweight" are optional. Pass "next_cursor" from the response as "cursor"
+            to get the next page. "lightweight" returns only the main columns of each notification.
         """
         try:
             data = request.get_json()
-            logger.info(msg=f"Received request to get history: {data}")
+            logger.info("Received request to get history", extra={'event': 'history_request', 'body': data})
             if data['from'] == "":
                 return {"msg": "'from' field can`t be empty"}, 500
 
@@ -49,6 +54,28 @@ class History(Resource):
             return {"msg": f"Can`t collect alerts history. Error - {err}"}, 500
 
 
+@ns.route('/export')
+class HistoryExport(Resource):
+    @token_required()
+    def post(self):
+        """
+            Streams all history rows matching provided filters as NDJSON. Filters are the same as for history.
+        """
+        try:
+            data = request.get_json()
+            logger.info("Received request to export history", extra={'event': 'history_request', 'body': data})
+            if data['from'] == "":
+                return {"msg": "'from' field can`t be empty"}, 500
+
+            if data['to'] == "":
+                return {"msg": "'to' field can`t be empty"}, 500
+
+            return Response(stream_with_context(Notifications.history_stream(data)), mimetype='application/x-ndjson')
+        except Exception as err:
+            logger.error(msg=f"Can`t export alerts history. Error: {err}\nTrace: {traceback.format_exc()}")
+            return {"msg": f"Can`t export alerts history. Error - {err}"}, 500
+
+
 @ns.route('/timeline')
 class TimeLineHistory(Resource):
     @token_required()
@@ -61,14 +88,6 @@ class TimeLineHistory(Resource):
         parser.add_argument('from', type=str, required=True, location='json', help='Start time to search.')
         parser.add_argument('to', type=str, required=True, location='json', help='End time to search.')
         data = parser.parse_args()
-        body = []
-        logger.info(msg=f"History request: {data}")
-        for alert_id in data['alert_ids']:
-            alert_stats = Notifications.obj_exist(alert_id)
-            if alert_stats:
-                body.append({
-                    "notification_id": alert_id,
-                    "name": alert_stats.name,
-                    "history": NotificationHistory.history(alert_id, data)
-                })
+        logger.info("History request", extra={'event': 'history_request', 'body': data})
+        body = NotificationHistory.timeline(data['alert_ids'], data)
         return {"msg": body}, 200
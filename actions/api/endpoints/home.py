@@ -85,7 +85,7 @@ class UserEdit(Resource):
         user_name = get_jwt_identity()
         obj_id = UsersDB.find_user_id_by_username(user_name)
         data = UserEdit.parser.parse_args()
-        logger.info(f"Request body: {json.dumps(data)}")
+        logger.info("Request body", extra={'event': 'home_request', 'body': data})
         object_ = UsersDB.obj_exist(obj_id)
         if object_:
             object_.user_schema = json.dumps(data['user_schema'])
@@ -8,6 +8,7 @@ from sqlalchemy.sql import func
 import json
 from werkzeug.exceptions import NotFound
 from actions.logic.auth_decorator import token_required
+from actions.logic.scenarios import invalidate_scenario
 
 logger = logging.getLogger('default')
 ns = api.namespace('api/v1/procedures', description='Procedures')
@@ -68,7 +69,7 @@ class ProceduresSearch(Resource):
         Search procedures by name with pattern, by alert, email, jira, skype, teams and telegram fields
         """
         data = ProceduresSearch.parser.parse_args()
-        logger.info(f"Request body: {json.dumps(data)}")
+        logger.info("Request body", extra={'event': 'procedure_request', 'body': data})
         result = Procedures.search(data)
         return {'msg': result}, 200
 
@@ -89,7 +90,7 @@ class DirectProceduresSearch(Resource):
         Direct search procedures by name with pattern and studio ids. The endpoint is used by Zergus.
         """
         data = DirectProceduresSearch.parser.parse_args()
-        logger.info(f"Request body: {json.dumps(data)}")
+        logger.info("Request body", extra={'event': 'procedure_request', 'body': data})
         result = Procedures.direct_search(data['pattern'], data['studio_ids'], data['tag'])
         return {'data': result}, 200
 
@@ -143,7 +144,7 @@ class ProceduresEdit(Resource):
         parser = ProceduresEdit.parser.copy()
         parser.remove_argument('studio_id')
         data = parser.parse_args()
-        logger.info(f"Request body: {json.dumps(data)}")
+        logger.info("Request body", extra={'event': 'procedure_request', 'body': data})
         obj_id = data.get('id', None)
         object_ = Procedures.obj_exist(obj_id)
         tags = data.get('tags', [])
@@ -171,6 +172,7 @@ class ProceduresEdit(Resource):
             object_.edited_by = user_id
             object_.last_update_ts = func.now()
             object_.save_to_db()
+            invalidate_scenario(obj_id)
             ActionsHistory.add_action_to_history("edit procedure", "procedures", obj_id, user_name, "",
                                                  json.dumps({'Procedure name': data['name']}))
             return {"msg": object_.json_self()}, 200
@@ -190,7 +192,7 @@ class ProceduresEdit(Resource):
         parser = ProceduresEdit.parser.copy()
         parser.remove_argument('id')
         data = parser.parse_args()
-        logger.info(f"Request body: {json.dumps(data)}")
+        logger.info("Request body", extra={'event': 'procedure_request', 'body': data})
         name = data.get('name', None)
         studios = data.get('studio_id', [])
         adding_summary = {'Already exist procedures': []}
@@ -257,6 +259,7 @@ class ProceduresEdit(Resource):
         obj = Procedures.obj_exist(obj_id)
         if obj:
             obj.delete_from_db()
+            invalidate_scenario(obj_id)
             ActionsHistory.add_action_to_history("delete procedure", "procedures", obj_id, user_name, "", "")
             return {"msg": "Deleted."}, 200
         return {"msg": "The query does not exist."}, 404
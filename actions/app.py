@@ -1,5 +1,5 @@
 import traceback
-from actions.settings import FLASK_SERVER_NAME, FLASK_SERVER_PORT, FLASK_THREADED, URL_PREFIX, SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS, ENVIRONMENTS_HOST
+from actions.settings import FLASK_SERVER_NAME, FLASK_SERVER_PORT, FLASK_THREADED, URL_PREFIX, SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS
 from apscheduler.schedulers.background import BackgroundScheduler
 from actions.api.restplus import api
 import logging
@@ -7,30 +7,19 @@ from flask import Flask, Blueprint
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 import os
-from prometheus_client import make_wsgi_app
+from prometheus_client import make_wsgi_app, multiprocess, CollectorRegistry, REGISTRY
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from prometheus_flask_exporter import PrometheusMetrics
-import requests
+from actions.tools.http_client import environments_client, reset_clients
+from actions.tools.db_pool import engine_options
+from actions.tools.db_instrumentation import instrument_engines
+from actions.tools.logging_pipeline import configure_logging
+from actions.tools.action_metrics import action_metrics
 import actions.settings as settings
-import logging_loki
-from multiprocessing import Queue
 from flask_restx.apidoc import apidoc
 
 # Logging
-harp_logger = logging.getLogger('default')
-harp_logger.setLevel(settings.LOG_LEVEL)
-log_format = logging.Formatter('[%(levelname)s] - %(message)s')
-
-loki_handler = logging_loki.LokiQueueHandler(
-    Queue(-1),
-    url=f"http://{settings.LOKI_SERVER}:{settings.LOKI_PORT}/loki/api/v1/push",
-    tags={"service": settings.SERVICE_NAME, "namespace": settings.SERVICE_NAMESPACE},
-    version="1",
-)
-loki_handler.setFormatter(log_format)
-console_handler = logging.StreamHandler()
-harp_logger.addHandler(loki_handler)
-harp_logger.addHandler(console_handler)
+harp_logger = configure_logging(logging.getLogger('default'))
 #
 
 async_mode = None
@@ -42,22 +31,23 @@ metrics = PrometheusMetrics(app)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = SQLALCHEMY_TRACK_MODIFICATIONS
-app.config['SQLALCHEMY_POOL_RECYCLE'] = 300
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+app.config['SQLALCHEMY_BINDS'] = settings.SQLALCHEMY_REPLICA_BINDS
 app.config['SECRET_KEY'] = 'secret!'
 
-studios = requests.get(f'http://{ENVIRONMENTS_HOST}/api/v1/environments/all').json()
-config = {'studios_dict': studios}
+# Filled by initialize_app before serving and refreshed by the scheduler
+config = {'studios_dict': {}}
 
 
 def update_studio_dict(old_config):
     try:
-        studios_dict = requests.get(f'http://{ENVIRONMENTS_HOST}/api/v1/environments/all').json()
+        studios_dict = environments_client.get('/api/v1/environments/all').json()
         if studios_dict:
             old_config['studios_dict'] = studios_dict
             harp_logger.info(f"Studios dictionary from Zergus updated with: {studios_dict}")
     except Exception as exc:
         harp_logger.error(f"Can't collect studios dictionary from Zergus. Error: {exc}\nTrace: {traceback.format_exc()}")
-        if not studios:
+        if not old_config['studios_dict']:
             raise Exception("Can't collect studios dictionary from Zergus")
 
 
@@ -68,6 +58,7 @@ def register_namespaces():
     from actions.api.endpoints.alerts import ns as alerts
     from actions.api.endpoints.history import ns as history
     from actions.api.endpoints.health import ns as health
+    from actions.api.endpoints.admin import ns as admin
 
     api.add_namespace(home)
     api.add_namespace(procedures)
@@ -75,6 +66,7 @@ def register_namespaces():
     api.add_namespace(alerts)
     api.add_namespace(history)
     api.add_namespace(health)
+    api.add_namespace(admin)
 
 
 def configure_app():
@@ -86,6 +78,19 @@ def configure_app():
     JWTManager(app)
 
 
+def metrics_app():
+    """
+    With PROMETHEUS_MULTIPROC_DIR set metrics are collected from all worker processes
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        action_metrics.register(registry)
+        return make_wsgi_app(registry)
+    action_metrics.register(REGISTRY)
+    return make_wsgi_app()
+
+
 def initialize_app():
     os.environ['TZ'] = 'UTC'
     update_studio_dict(config)
@@ -95,23 +100,105 @@ def initialize_app():
     blueprint_main = Blueprint('main', __name__)
     api.init_app(blueprint)
     app.register_blueprint(blueprint)
-    app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {'/metrics': make_wsgi_app()})
+    app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {'/metrics': metrics_app()})
     register_namespaces()
-    scheduler_jobs()
+
+
+def refresh_active_notifications():
+    from actions.logic.db import active_notifications_index
+    try:
+        with app.app_context():
+            active_notifications_index.refresh()
+    except Exception as exc:
+        harp_logger.error(f"Can't refresh active notifications index. Error: {exc}\nTrace: {traceback.format_exc()}")
+
+
+def sync_search_index():
+    from actions.logic.db import search_index
+    try:
+        with app.app_context():
+            search_index.sync()
+    except Exception as exc:
+        harp_logger.error(f"Can't sync history search index. Error: {exc}\nTrace: {traceback.format_exc()}")
+
+
+def reconcile_procedure_reviews():
+    from actions.logic.procedure_reviews import reconcile_review_statuses
+    try:
+        with app.app_context():
+            reconcile_review_statuses()
+    except Exception as exc:
+        harp_logger.error(f"Can't reconcile procedure review statuses. Error: {exc}\nTrace: {traceback.format_exc()}")
 
 
 def scheduler_jobs():
     scheduler = BackgroundScheduler()
     scheduler.add_job(update_studio_dict, 'interval', args=[config], seconds=60)
+    if settings.ACTIVE_NOTIFICATIONS_INDEX_ENABLED:
+        scheduler.add_job(refresh_active_notifications, 'interval', seconds=settings.ACTIVE_NOTIFICATIONS_REFRESH_SECONDS)
+    if settings.HISTORY_SEARCH_MODE == 'trigram':
+        scheduler.add_job(sync_search_index, 'interval', seconds=settings.HISTORY_SEARCH_INDEX_SYNC_SECONDS)
+    scheduler.add_job(reconcile_procedure_reviews, 'interval', seconds=settings.JIRA_RECONCILE_SECONDS)
     scheduler.start()
 
 
-def main():
+def init_database():
     from actions.logic.db import db
     db.init_app(app)
     db.app = app
+    instrument_engines()
+
+
+def prepare_database():
+    """
+    Schema changes, done once before serving
+    """
+    from actions.logic.db import db
+    from actions.logic.migrations import run_migrations
     db.create_all()
+    run_migrations()
+
+
+def start_background_jobs():
+    """
+    Scheduler threads and in-memory indexes don't survive fork, they are started in every serving process
+    """
+    scheduler_jobs()
+    if settings.ACTIVE_NOTIFICATIONS_INDEX_ENABLED:
+        refresh_active_notifications()
+
+
+def create_app():
+    """
+    Application for a WSGI server, background jobs are started per worker by init_worker
+    """
+    init_database()
+    prepare_database()
+    initialize_app()
+    return app
+
+
+def init_worker():
+    """
+    Called in every worker process after the application is loaded. Connections of the primary and
+    replica engines inherited from the parent process are dropped so processes never share sockets.
+    """
+    from actions.logic.db import db
+    db.engine.dispose()
+    for bind in settings.SQLALCHEMY_REPLICA_BINDS:
+        db.get_engine(app, bind=bind).dispose()
+    reset_clients()
+    start_background_jobs()
+
+
+def main():
+    """
+    Development server, production uses gunicorn with actions/gunicorn_conf.py
+    """
+    init_database()
+    prepare_database()
     initialize_app()
+    start_background_jobs()
     app.run(port=FLASK_SERVER_PORT, host=FLASK_SERVER_NAME,  debug=False, threaded=FLASK_THREADED)
     harp_logger.info('>>>>> Starting development server at http://{0}:{1}{2}/ <<<<<'.format(FLASK_SERVER_NAME, FLASK_SERVER_PORT, URL_PREFIX))
 
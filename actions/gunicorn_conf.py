@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration:
+
+    gunicorn --config python:actions.gunicorn_conf actions.wsgi:application
+
+With preload the master process runs migrations once and forks workers, SIGHUP restarts workers gracefully
+(code changes need a full restart then). Metrics of all workers are collected from PROMETHEUS_MULTIPROC_DIR.
+"""
+import os
+import shutil
+import actions.settings as settings
+
+bind = f"{settings.FLASK_SERVER_NAME}:{settings.FLASK_SERVER_PORT}"
+worker_class = 'gthread'
+workers = settings.GUNICORN_WORKERS
+threads = settings.GUNICORN_THREADS
+keepalive = settings.GUNICORN_KEEPALIVE_SECONDS
+timeout = settings.GUNICORN_TIMEOUT_SECONDS
+graceful_timeout = settings.GUNICORN_GRACEFUL_TIMEOUT_SECONDS
+max_requests = settings.GUNICORN_MAX_REQUESTS
+max_requests_jitter = settings.GUNICORN_MAX_REQUESTS_JITTER
+preload_app = settings.GUNICORN_PRELOAD
+accesslog = None
+
+
+def on_starting(server):
+    # Metric files of the previous run would be summed with the new ones
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def post_worker_init(worker):
+    from actions.app import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker, updates queued before a restart are not lost
+    from actions.logic.force_update import force_update_dispatcher
+    force_update_dispatcher.flush()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,127 @@
+import datetime
+import logging
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import func
+
+logger = logging.getLogger('default')
+
+
+class ActiveNotificationsIndex(object):
+    """
+    In-memory index of active notifications (notification_status != 0) by source and object_name.
+    It is built from the database once and kept in sync by the write paths of this service (reload)
+    and by a periodic incremental refresh over last_update_ts for notifications changed by other services.
+    Serialized rows are stored, so lookups cost O(result) and don't touch the database.
+    """
+    def __init__(self, model, refresh_overlap_seconds: float = 5, rebuild_seconds: float = 600):
+        self.model = model
+        self.refresh_overlap_seconds = refresh_overlap_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.ready = False
+        self._built_ts = 0
+        self._rows = {}
+        self._by_source = defaultdict(set)
+        self._by_object = defaultdict(set)
+        self._watermark = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _remove(self, obj_id):
+        row = self._rows.pop(obj_id, None)
+        if row:
+            self._by_source[row['source']].discard(obj_id)
+            if not self._by_source[row['source']]:
+                del self._by_source[row['source']]
+            self._by_object[row['object_name']].discard(obj_id)
+            if not self._by_object[row['object_name']]:
+                del self._by_object[row['object_name']]
+
+    def _apply(self, notification, loaded_ts):
+        """
+        Puts or removes one notification, rows older than the indexed one are ignored
+        """
+        current = self._rows.get(notification.id)
+        if current and current['last_update_ts'] > notification.last_update_ts:
+            return
+        self._remove(notification.id)
+        if notification.notification_status != 0:
+            self._rows[notification.id] = {
+                'source': notification.source,
+                'object_name': notification.object_name,
+                'last_update_ts': notification.last_update_ts,
+                'details': notification.json_self(),
+                'loaded_ts': loaded_ts
+            }
+            self._by_source[notification.source].add(notification.id)
+            self._by_object[notification.object_name].add(notification.id)
+
+    def _next_watermark(self):
+        """
+        Database clock is used, last_update_ts is mostly set by the database and other services
+        """
+        now = self.model.query.session.query(func.now()).scalar()
+        return now - datetime.timedelta(seconds=self.refresh_overlap_seconds)
+
+    def rebuild(self):
+        job_start_ts = time.time()
+        watermark = self._next_watermark()
+        notifications = self.model.query.filter(self.model.notification_status != 0).all()
+        with self._lock:
+            self._rows.clear()
+            self._by_source.clear()
+            self._by_object.clear()
+            for notification in notifications:
+                self._apply(notification, job_start_ts)
+            self._watermark = watermark
+            self._built_ts = job_start_ts
+            self.ready = True
+        logger.info(msg=f"Active notifications index has been built with {len(notifications)} notifications. "
+                        f"Time spend (seconds): {int(time.time() - job_start_ts)}")
+
+    def refresh(self):
+        """
+        Applies notifications updated since the previous refresh. Rows deleted from the database
+        are only noticed by a full rebuild, which is done every rebuild_seconds.
+        """
+        if not self.ready or time.time() - self._built_ts > self.rebuild_seconds:
+            self.rebuild()
+            return
+        loaded_ts = time.time()
+        watermark = self._next_watermark()
+        notifications = self.model.query.filter(self.model.last_update_ts >= self._watermark).all()
+        with self._lock:
+            for notification in notifications:
+                self._apply(notification, loaded_ts)
+            self._watermark = watermark
+
+    def reload(self, obj_ids: list):
+        """
+        Re-reads notifications changed by this service
+        """
+        if not self.ready or not obj_ids:
+            return
+        loaded_ts = time.time()
+        obj_ids = [int(obj_id) for obj_id in obj_ids]
+        notifications = self.model.query.filter(self.model.id.in_(obj_ids)).all()
+        with self._lock:
+            found = set()
+            for notification in notifications:
+                found.add(notification.id)
+                self._apply(notification, loaded_ts)
+            for obj_id in set(obj_ids) - found:
+                self._remove(obj_id)
+
+    def _lookup(self, keys, key):
+        with self._lock:
+            rows = [self._rows[obj_id] for obj_id in keys.get(key, ())]
+        return [self.model.aged_details(row['details'], row['loaded_ts']) for row in rows]
+
+    def for_source(self, source):
+        return self._lookup(self._by_source, source)
+
+    def for_object(self, object_name):
+        return self._lookup(self._by_object, object_name)
@@ -1,98 +1,104 @@
+import hashlib
+import time
 from functools import wraps
-from flask import request
+from flask import request, g
 from flask_jwt_extended import decode_token
 from flask_jwt_extended.jwt_manager import ExpiredSignatureError, InvalidTokenError
+from werkzeug.local import LocalProxy
 import logging
+import actions.settings as settings
+from actions.tools.cache import TTLCache
 
 logger = logging.getLogger('default')
 
+INVALID_MSG = {
+    'message': 'Invalid token. Registration and / or authentication required',
+    'authenticated': False
+}
 
-def token_required():
-    def wrapper(fn):
-        @wraps(fn)
-        def decorator(*args, **kwargs):
-            # Make endpoint in the Auth Service to validate an Auth Token
-            # The endpoint will return details such as User's Account ID
+EXPIRED_MSG = {
+    'message': 'Expired token. Re authentication required',
+    'authenticated': False
+}
 
-            invalid_msg = {
-                'message': 'Invalid token. Registration and / or authentication required',
-                'authenticated': False
-            }
-
-            expired_msg = {
-                'message': 'Expired token. Re authentication required',
-                'authenticated': False
-            }
-
-            absent_token = {
-                'message': 'AuthToken is not present in header of request',
-                'authenticated': False
-            }
-
-            auth_token = request.headers.get('AuthToken')
-            if auth_token is None:
-                return absent_token, 401
-            try:
-                data = decode_token(auth_token, allow_expired=False)
-                if data:
-                    return fn(*args, **kwargs)
-                else:
-                    # You can also redirect the user to the login page.
-                    logger.error(
-                        msg=f"User auth was failed\nMessage: {invalid_msg}\nHeader: {request.headers}"
-                    )
-                    return invalid_msg, 401
-
-            except ExpiredSignatureError as err:
-                logger.error(
-                    msg=f"User auth was failed\nMessage: {expired_msg}\nHeader: {request.headers}\nError: {err}"
-                )
-                return expired_msg, 401
-            except (InvalidTokenError, Exception) as err:
-                logger.error(
-                    msg=f"User auth was failed\nMessage: {invalid_msg}\nHeader: {request.headers}\nError: {err}"
-                )
-                return invalid_msg, 401
-        return decorator
-    return wrapper
+ABSENT_TOKEN = {
+    'message': 'AuthToken is not present in header of request',
+    'authenticated': False
+}
+
+# Claims of verified tokens by token hash, entries are never served after the token exp
+verified_tokens = TTLCache(name='verified_tokens', ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS, max_size=settings.AUTH_TOKEN_CACHE_MAX_SIZE)
+
+
+class Identity(object):
+    def __init__(self, auth_token: str, claims: dict):
+        self.auth_token = auth_token
+        self.claims = claims
+        self.username = claims['sub']
 
 
-def get_user_id_by_token(auth_token):
-    invalid_msg = {
-        'message': 'Invalid token. Registration and / or authentication required',
-        'authenticated': False
-    }
+# Identity of the current request, set by token_required
+current_identity = LocalProxy(lambda: g.get('identity'))
 
-    expired_msg = {
-        'message': 'Expired token. Re authentication required',
-        'authenticated': False
-    }
 
-    absent_token = {
-        'message': 'AuthToken is not present in header of request',
-        'authenticated': False
-    }
+def verify_token(auth_token):
+    """
+    Returns claims of the token, the signature is verified once per token while it is cached
+    """
+    key = hashlib.sha256(auth_token.encode()).hexdigest()
+    claims = verified_tokens.get(key)
+    if claims is None:
+        claims = decode_token(auth_token, allow_expired=False)
+        if claims:
+            verified_tokens.set(key, claims)
+    elif 'exp' in claims and claims['exp'] <= time.time():
+        verified_tokens.invalidate(key)
+        raise ExpiredSignatureError('Signature has expired')
+    return claims
 
+
+def authenticate(auth_token):
+    """
+    Verifies the token and keeps the identity for the request, returns error response if it is not valid
+    """
     if auth_token is None:
-        return absent_token, 401
+        return ABSENT_TOKEN, 401
+    identity = g.get('identity')
+    if identity and identity.auth_token == auth_token:
+        return None
     try:
-        data = decode_token(auth_token, allow_expired=False)
-        if data:
-            return data['sub']
+        claims = verify_token(auth_token)
+        if claims:
+            g.identity = Identity(auth_token, claims)
+            return None
         else:
             # You can also redirect the user to the login page.
             logger.error(
-                msg=f"User auth was failed\nMessage: {invalid_msg}\nHeader: {request.headers}"
+                msg=f"User auth was failed\nMessage: {INVALID_MSG}\nHeader: {request.headers}"
             )
-            return invalid_msg, 401
+            return INVALID_MSG, 401
 
     except ExpiredSignatureError as err:
         logger.error(
-            msg=f"User auth was failed\nMessage: {expired_msg}\nHeader: {request.headers}\nError: {err}"
+            msg=f"User auth was failed\nMessage: {EXPIRED_MSG}\nHeader: {request.headers}\nError: {err}"
         )
-        return expired_msg, 401
+        return EXPIRED_MSG, 401
     except (InvalidTokenError, Exception) as err:
         logger.error(
-            msg=f"User auth was failed\nMessage: {invalid_msg}\nHeader: {request.headers}\nError: {err}"
+            msg=f"User auth was failed\nMessage: {INVALID_MSG}\nHeader: {request.headers}\nError: {err}"
         )
-        return invalid_msg, 401
+        return INVALID_MSG, 401
+
+
+def token_required():
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            # Make endpoint in the Auth Service to validate an Auth Token
+            # The endpoint will return details such as User's Account ID
+            error = authenticate(request.headers.get('AuthToken'))
+            if error:
+                return error
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -1,19 +1,55 @@
-from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql import func
-from sqlalchemy import or_, desc
+from sqlalchemy import or_, and_, desc
+from sqlalchemy.orm import defer
 from flask_jwt_extended import create_access_token, create_refresh_token
+import base64
 import datetime
 import json
 import time
 import logging
 from actions.app import config
-from actions.settings import TOKEN_EXPIRE_HOURS, TIME_LIMIT_ALERTS_HISTORY_DAYS
+from actions.settings import TOKEN_EXPIRE_HOURS, TIME_LIMIT_ALERTS_HISTORY_DAYS, HISTORY_EVENTS_WITHOUT_COMMENTS_LIMIT, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE, \
+    HISTORY_EXPORT_BATCH_SIZE, HISTORY_SEARCH_MODE, HISTORY_SEARCH_INDEX_BATCH_SIZE, HISTORY_SEARCH_INDEX_LOOKBACK_IDS, \
+    HISTORY_SEARCH_MAX_TRIGRAMS, HISTORY_SEARCH_MAX_CANDIDATES, \
+    NOTIFICATION_DETAILS_CACHE_TTL_SECONDS, NOTIFICATION_DETAILS_CACHE_MAX_SIZE, NOTIFICATION_DETAILS_CACHE_LOCAL_TTL_SECONDS, \
+    ACTIVE_NOTIFICATIONS_REBUILD_SECONDS, DB_FRESH_READS_ISOLATION_LEVEL
+from actions.logic.active_index import ActiveNotificationsIndex
 from actions.logic.common_func import convert_json_simple_to_dict
-from actions.logic.jira import GenerateJira
+from actions.logic.search_index import TrigramSearchIndex
+from actions.tools.cache import TTLCache, shared_backend
+from actions.tools.db_routing import RoutingSQLAlchemy, read_only, primary_reads, mark_written
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 logger = logging.getLogger('default')
 
+def fresh_query(model):
+    """
+    Query which reads the latest committed rows and overwrites objects already loaded in the session.
+    The transaction of the read runs with DB_FRESH_READS_ISOLATION_LEVEL, set on its connection only and reset
+    when the connection goes back to the pool. A transaction started before with the default level reads from
+    its snapshot, it is committed first.
+    """
+    session = db.session()
+    bind_arguments = {'mapper': model.__mapper__}
+    if session.in_transaction():
+        connection = session.connection(bind_arguments=bind_arguments)
+        if connection.get_execution_options().get('isolation_level') == DB_FRESH_READS_ISOLATION_LEVEL:
+            return model.query.populate_existing()
+        session.commit()
+    session.connection(bind_arguments=bind_arguments,
+                       execution_options={'isolation_level': DB_FRESH_READS_ISOLATION_LEVEL})
+    return model.query.populate_existing()
+
+
+# Shared by workers when CACHE_REDIS_URL is set, otherwise invalidations of other workers apply within the local TTL
+notification_details_cache = TTLCache(
+    name='notification_details',
+    ttl=NOTIFICATION_DETAILS_CACHE_TTL_SECONDS,
+    max_size=NOTIFICATION_DETAILS_CACHE_MAX_SIZE,
+    backend=shared_backend(),
+    local_ttl=NOTIFICATION_DETAILS_CACHE_LOCAL_TTL_SECONDS
+)
+
 
 class Procedures(db.Model):
     __tablename__ = 'procedures'
@@ -103,6 +139,7 @@ class Procedures(db.Model):
         return cls.query.filter_by(name=name).filter_by(studio_id=studio_id).one_or_none()
 
     @classmethod
+    @read_only
     def search(cls, data):
         result = []
         objects = cls.query
@@ -158,13 +195,8 @@ class Procedures(db.Model):
             ])
             objects = objects.filter(or_(*expression))
 
+        # procedure_review_status is cleared by the review reconciliation job once the Jira is closed
         for item in objects.all():
-            if item.procedure_review_status:
-                jira_obj = GenerateJira(jira_id=item.procedure_review_status)
-                if jira_obj.check_jira_status():
-                    item.procedure_review_status = None
-                    item.save_to_db()
-
             result.append({
                 'id': item.id,
                 'name': item.name,
@@ -187,6 +219,19 @@ class Procedures(db.Model):
         return result
 
     @classmethod
+    def pending_review_ids(cls):
+        return [row[0] for row in db.session.query(cls.procedure_review_status)
+                .filter(cls.procedure_review_status.isnot(None), cls.procedure_review_status != '').distinct()]
+
+    @classmethod
+    def clear_review_status(cls, jira_ids: list):
+        if jira_ids:
+            cls.query.filter(cls.procedure_review_status.in_(jira_ids))\
+                .update({'procedure_review_status': None}, synchronize_session=False)
+            db.session.commit()
+
+    @classmethod
+    @read_only
     def direct_search(cls, pattern, studio_ids, tag):
         result = {}
         objects = cls.query
@@ -221,39 +266,95 @@ class NotificationHistory(db.Model):
         }
 
     @classmethod
-    def history(cls, obj_id, data=None):
-        history = []
-        if data == 0:
-            history_events = cls.query.filter_by(alert_id=obj_id).filter(
-                cls.last_update_ts >= data['from'],
-                cls.last_create_ts <= data['to']
-            ).order_by(cls.time_stamp.desc()).all()
+    def time_filter(cls, data=None):
+        """
+        Events between 'from' and 'to' of data, the default window if any of them is missing or empty
+        """
+        if data and data.get('from') and data.get('to'):
+            return and_(cls.time_stamp >= data['from'], cls.time_stamp <= data['to'])
+
+        # '1970-01-01 00:00:01'
+        time_limit = (datetime.datetime.now() - datetime.timedelta(days=TIME_LIMIT_ALERTS_HISTORY_DAYS))\
+            .strftime("%Y/%m/%d %H:%M:%S")
+        return cls.time_stamp >= time_limit
 
-        else:
-            # '1970-01-01 00:00:01'
-            time_limit = (datetime.datetime.now() - datetime.timedelta(days=TIME_LIMIT_ALERTS_HISTORY_DAYS))\
-                .strftime("%Y/%m/%d %H:%M:%S")
-            history_events = cls.query.filter_by(alert_id=obj_id).filter(cls.time_stamp >= time_limit)\
-                .order_by(cls.time_stamp.desc()).all()
-        if history_events:
-            not_comments_count = 0
-            for history_event in history_events:
-                if not history_event.comments:
-                    not_comments_count += 1
-                    if not_comments_count > 15:
-                        continue
-                    comments = {}
-                else:
-                    comments = json.loads(history_event.comments)
-
-                history.append({
-                    "last_change_ts": int(history_event.time_stamp.strftime('%s')),
-                    "notification_action": history_event.notification_action,
-                    "notification_output": history_event.notification_output,
-                    "comments": comments
-                })
+    @classmethod
+    def displayed_events(cls, alert_ids: list, data=None, with_output=True):
+        """
+        Events with comments and only the latest events without comments for every alert.
+        notification_output is not loaded if with_output is False.
+        """
+        without_comments = or_(cls.comments.is_(None), cls.comments == '')
+        row_number = func.row_number().over(partition_by=cls.alert_id, order_by=cls.time_stamp.desc())
+        latest = db.session.query(cls.id.label('id'), row_number.label('row_number'))\
+            .filter(cls.alert_id.in_(alert_ids), cls.time_filter(data), without_comments).subquery()
+        latest_ids = db.session.query(latest.c.id).filter(latest.c.row_number <= HISTORY_EVENTS_WITHOUT_COMMENTS_LIMIT)
+
+        history_events = cls.query.filter(
+            cls.alert_id.in_(alert_ids),
+            cls.time_filter(data),
+            or_(cls.comments != '', cls.id.in_(latest_ids))
+        )
+        if not with_output:
+            history_events = history_events.options(defer(cls.notification_output))
+        return history_events.order_by(cls.alert_id, cls.time_stamp.desc()).all()
+
+    @staticmethod
+    def history_body(history_events, with_output=True):
+        history = []
+        for history_event in history_events:
+            history.append({
+                "event_id": history_event.id,
+                "last_change_ts": int(history_event.time_stamp.strftime('%s')),
+                "notification_action": history_event.notification_action,
+                "notification_output": history_event.notification_output if with_output else None,
+                "comments": json.loads(history_event.comments) if history_event.comments else {}
+            })
         return history
 
+    @classmethod
+    @read_only
+    def history(cls, obj_id, data=None, with_output=True):
+        history_events = cls.displayed_events([int(obj_id)], data, with_output)
+        return cls.history_body(history_events, with_output)
+
+    @classmethod
+    def cached_history(cls, obj_id):
+        obj_id = int(obj_id)
+
+        def load():
+            # Cached result is shared by all clients, so it is read from the primary
+            with primary_reads():
+                return {"statistics": Statistics.statistic(obj_id), "body": cls.history(obj_id)}
+        return notification_details_cache.get_or_load(('history', obj_id), load)
+
+    @classmethod
+    @read_only
+    def event_output(cls, event_id):
+        event = db.session.query(cls.notification_output).filter_by(id=event_id).one_or_none()
+        return event.notification_output if event else None
+
+    @classmethod
+    @read_only
+    def timeline(cls, alert_ids: list, data: dict):
+        """
+        History of several alerts with two queries: names of the alerts and all their events in the time window
+        """
+        alert_ids = [int(alert_id) for alert_id in alert_ids]
+        names = Notifications.names(alert_ids)
+        events = {alert_id: [] for alert_id in names}
+        if names:
+            for history_event in cls.displayed_events(list(names), data):
+                events[history_event.alert_id].append(history_event)
+
+        return [
+            {
+                "notification_id": alert_id,
+                "name": names[alert_id],
+                "history": cls.history_body(events[alert_id])
+            } for alert_id in alert_ids if alert_id in names
+        ]
+
     @classmethod
     def add_new_event(cls, data: dict):
         notification = cls(**data)
@@ -261,6 +362,9 @@ class NotificationHistory(db.Model):
         db.session.commit()
 
 
+db.Index('ix_notification_history_alert_id_time_stamp', NotificationHistory.alert_id, NotificationHistory.time_stamp.desc())
+
+
 class Notifications(db.Model):
     __tablename__ = 'notifications'
     __table_args__ = (
@@ -268,6 +372,9 @@ class Notifications(db.Model):
             'name', 'studio', 'ms', 'source', 'object_name', 'ms_alert_id', 'service',
             name='unique_component_commit'
         ),
+        db.Index('ix_notifications_source_notification_status', 'source', 'notification_status'),
+        db.Index('ix_notifications_object_name_notification_status', 'object_name', 'notification_status'),
+        db.Index('ix_notifications_last_update_ts_id', 'last_update_ts', 'id'),
     )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, unique=True)
@@ -299,6 +406,7 @@ class Notifications(db.Model):
     last_create_ts = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), nullable=False)
 
     def json_self(self):
+        last_create_ts = int(self.last_create_ts.strftime('%s'))
         return {
             'id': self.id,
             'name': self.name,
@@ -318,8 +426,8 @@ class Notifications(db.Model):
             'image': convert_json_simple_to_dict(self.image) if self.image else None,
             'recipient_id': self.recipient_id,
 
-            'current_duration': 0 if self.notification_status == 0 else int(time.time() - int(self.last_create_ts.strftime('%s'))),
-            'total_duration': self.total_duration + (int(time.time() - int(self.last_create_ts.strftime('%s')))),
+            'current_duration': 0 if self.notification_status == 0 else int(time.time() - last_create_ts),
+            'total_duration': self.total_duration + (int(time.time() - last_create_ts)),
 
             'notification_status': self.notification_status,
             'assign_status': self.assign_status,
@@ -343,8 +451,7 @@ class Notifications(db.Model):
 
     @classmethod
     def get_notification_by_id(cls, event_id):
-        db.session.commit()
-        queries = cls.query.filter_by(id=event_id).all()
+        queries = fresh_query(cls).filter_by(id=event_id).all()
 
         return queries
 
@@ -354,11 +461,77 @@ class Notifications(db.Model):
 
     def save_to_db(self):
         db.session.add(self)
+        db.session.flush()
+        search_index.reindex([self.id])
         db.session.commit()
+        Notifications.changed([self.id])
 
     def delete_from_db(self):
         db.session.delete(self)
+        search_index.reindex([self.id])
         db.session.commit()
+        Notifications.changed([self.id])
+
+    @classmethod
+    def load_details(cls, obj_id):
+        alert = cls.obj_exist(obj_id)
+        if not alert:
+            return None
+
+        alert_details = alert.json_self()
+        if alert_details['assign_status'] == 1:
+            assigned = Assign.obj_exist(obj_id)
+            if assigned:
+                alert_details['assigned'] = assigned.json()
+            else:
+                alert_details['assigned'] = {}
+                logger.error(msg=f"Assigned row is not found in assign table for alert_id: {obj_id}")
+        else:
+            alert_details['assigned'] = {}
+        return {'details': alert_details, 'loaded_ts': time.time()}
+
+    @classmethod
+    def details(cls, obj_id):
+        """
+        Notification details with assign info from notification_details_cache, None if notification doesn't exist.
+        Durations are moved forward by the age of the cached entry.
+        """
+        key = ('details', int(obj_id))
+        cached = notification_details_cache.get_or_load(key, lambda: cls.load_details(obj_id))
+        if cached is None:
+            notification_details_cache.invalidate(key)
+            return None
+
+        return cls.aged_details(cached['details'], cached['loaded_ts'])
+
+    @staticmethod
+    def aged_details(details: dict, loaded_ts: float):
+        """
+        Copy of json_self result with durations moved forward by the time passed since it was built
+        """
+        details = dict(details)
+        age = int(time.time() - loaded_ts)
+        details['total_duration'] += age
+        if details['notification_status'] != 0:
+            details['current_duration'] += age
+        return details
+
+    @staticmethod
+    def invalidate_details(obj_ids: list):
+        for obj_id in obj_ids:
+            notification_details_cache.invalidate(('details', int(obj_id)))
+            notification_details_cache.invalidate(('history', int(obj_id)))
+
+    @classmethod
+    def changed(cls, obj_ids: list):
+        """
+        Must be called after notifications are changed by this service
+        """
+        cls.invalidate_details(obj_ids)
+        try:
+            active_notifications_index.reload(obj_ids)
+        except Exception as err:
+            logger.error(msg=f"Can't reload active notifications index for {obj_ids}, it is fixed by the next refresh. Error: {err}")
 
     @classmethod
     def current_output(cls, obj_id):
@@ -367,6 +540,24 @@ class Notifications(db.Model):
             return convert_json_simple_to_dict(obj.output)['current']
         return ""
 
+    @classmethod
+    def current_outputs(cls, obj_ids: list):
+        outputs = {}
+        rows = db.session.query(cls.id, cls.output).filter(cls.id.in_(obj_ids)).all()
+        for obj_id, output in rows:
+            outputs[obj_id] = convert_json_simple_to_dict(output)['current']
+        return outputs
+
+    @classmethod
+    def names(cls, obj_ids: list):
+        rows = db.session.query(cls.id, cls.name).filter(cls.id.in_(obj_ids)).all()
+        return {obj_id: name for obj_id, name in rows}
+
+    @classmethod
+    def studio_ids(cls, obj_ids: list):
+        rows = db.session.query(cls.id, cls.studio).filter(cls.id.in_(obj_ids)).all()
+        return {obj_id: studio for obj_id, studio in rows}
+
     @classmethod
     def update_description(cls, obj_id, description):
         alert = cls.query.filter_by(id=obj_id).one_or_none()
@@ -381,10 +572,13 @@ class Notifications(db.Model):
             alert.notification_status = notification_status
             alert.last_update_ts = func.now()
             db.session.commit()
-            logger.info(msg=f"Changing notification status of alert.")
+            cls.changed([obj_id])
+            logger.info("Changing notification status of alert: %s", obj_id)
 
     @classmethod
     def active_notifications_for_source(cls, source):
+        if active_notifications_index.ready:
+            return active_notifications_index.for_source(source)
         notifications_list = []
         notifications = cls.query.filter_by(source=source).\
             filter(cls.notification_status != 0).all()
@@ -394,6 +588,8 @@ class Notifications(db.Model):
 
     @classmethod
     def active_notifications_for_object(cls, source_object):
+        if active_notifications_index.ready:
+            return active_notifications_index.for_object(source_object)
         notifications_list = []
         notifications = cls.query.filter_by(object_name=source_object).\
             filter(cls.notification_status != 0).all()
@@ -402,10 +598,7 @@ class Notifications(db.Model):
         return notifications_list
 
     @classmethod
-    def history(cls, data):
-        job_start_ts = time.time()
-        notifications_list = []
-        env_statistics = {}
+    def history_query(cls, data):
         notifications = cls.query.filter(
             cls.last_update_ts >= data['from'],
             cls.last_create_ts <= data['to']
@@ -421,7 +614,7 @@ class Notifications(db.Model):
             notifications = notifications.filter(cls.ms.like("%{}%".format(data['monitoring_system'])))
 
         if data['scenario_id']:
-            notifications = notifications.filter_by(procedure_id=data['procedure_id'])
+            notifications = notifications.filter_by(procedure_id=data['scenario_id'])
 
         if data['service']:
             notifications = notifications.filter(cls.service.like("%{}%".format(data['service'])))
@@ -436,41 +629,161 @@ class Notifications(db.Model):
             notifications = notifications.filter(cls.object_name.like("%{}%".format(data['object'])))
 
         if data['pattern']:
-            notifications = notifications\
-                .filter(or_(cls.service.like("%{}%".format(data['pattern'])),
-                            (cls.source.like("%{}%".format(data['pattern']))),
-                            (cls.object_name.like("%{}%".format(data['pattern']))),
-                            (cls.name.like("%{}%".format(data['pattern']))),
-                            (cls.ms.like("%{}%".format(data['pattern'])))
-                            )
-                        )
-
-        notifications = notifications.order_by(desc(cls.last_update_ts)).limit(100)
-
-        for notification in notifications.all():
-            notifications_list.append(
-                {
-                    'body': notification.json_self(),
-                    'last_change_ts': str(notification.last_update_ts),
-                    'notification_id': notification.id,
-                    'panel_type': 'single_alert',
-                    'notification_status': notification.notification_status
-                 }
-            )
+            notifications = notifications.filter(cls.search_filter(data['pattern']))
 
-            if notification.json_self()['studio_id'] in env_statistics:
-                env_statistics[notification.json_self()['studio_id']] += 1
-            else:
-                env_statistics[notification.json_self()['studio_id']] = 1
+        return notifications
 
-        logger.info(msg=f"Objects found: {len(notifications_list)}. Time spend (seconds): {int(time.time() - job_start_ts)}. Request: {data}")
+    search_mode = HISTORY_SEARCH_MODE
+    search_columns = ['service', 'source', 'object_name', 'name', 'ms']
 
-        return {"notifications": notifications_list, "notification_statistics": env_statistics}
+    @classmethod
+    def search_filter(cls, pattern):
+        like_filter = or_(cls.service.like("%{}%".format(pattern)),
+                          (cls.source.like("%{}%".format(pattern))),
+                          (cls.object_name.like("%{}%".format(pattern))),
+                          (cls.name.like("%{}%".format(pattern))),
+                          (cls.ms.like("%{}%".format(pattern)))
+                          )
+        if cls.search_mode != 'trigram':
+            return like_filter
+
+        # The index narrows down the rows, LIKE keeps exact substring semantics for the found ones
+        candidate_filter = search_index.candidate_filter(pattern)
+        if candidate_filter is None:
+            return like_filter
+        return and_(candidate_filter, like_filter)
+
+    @classmethod
+    def history_light_columns(cls):
+        return (
+            cls.id, cls.name, cls.studio, cls.ms, cls.source, cls.object_name, cls.service, cls.severity,
+            cls.notification_status, cls.assign_status, cls.snooze_expire_ts, cls.procedure_id, cls.last_update_ts
+        )
+
+    @staticmethod
+    def json_history_light(row):
+        return {
+            'body': {
+                'id': row.id,
+                'name': row.name,
+                'studio': config['studios_dict'][str(row.studio)],
+                'studio_id': row.studio,
+                'monitoring_system': row.ms,
+                'source': row.source,
+                'object': row.object_name,
+                'service': row.service,
+                'severity': row.severity,
+                'notification_status': row.notification_status,
+                'assign_status': row.assign_status,
+                'snooze_expire_ts': int(row.snooze_expire_ts.strftime('%s')),
+                'procedure_id': row.procedure_id,
+                'last_update_ts': int(row.last_update_ts.strftime('%s'))
+            },
+            'last_change_ts': str(row.last_update_ts),
+            'notification_id': row.id,
+            'panel_type': 'single_alert',
+            'notification_status': row.notification_status
+        }
+
+    @classmethod
+    def history_statistics(cls, data):
+        rows = cls.history_query(data).with_entities(cls.studio, func.count(cls.id)).group_by(cls.studio).all()
+        return {studio: count for studio, count in rows}
+
+    @classmethod
+    def history_rows(cls, data):
+        """
+        Returns ordered history query and the function to serialize its rows
+        """
+        notifications = cls.history_query(data).order_by(desc(cls.last_update_ts), desc(cls.id))
+        if data.get('lightweight'):
+            return notifications.with_entities(*cls.history_light_columns()), cls.json_history_light
+        return notifications, cls.json_history
+
+    @staticmethod
+    def encode_history_cursor(notification):
+        raw_cursor = f"{notification.last_update_ts.strftime('%Y-%m-%d %H:%M:%S')}|{notification.id}"
+        return base64.urlsafe_b64encode(raw_cursor.encode()).decode()
+
+    @staticmethod
+    def decode_history_cursor(cursor):
+        last_update_ts, obj_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.strptime(last_update_ts, '%Y-%m-%d %H:%M:%S'), int(obj_id)
+
+    def json_history(self):
+        return {
+            'body': self.json_self(),
+            'last_change_ts': str(self.last_update_ts),
+            'notification_id': self.id,
+            'panel_type': 'single_alert',
+            'notification_status': self.notification_status
+        }
+
+    @classmethod
+    @read_only
+    def history(cls, data):
+        job_start_ts = time.time()
+        page_size = min(int(data.get('page_size') or HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE)
+        notifications, serialize = cls.history_rows(data)
+
+        if data.get('cursor'):
+            last_update_ts, obj_id = cls.decode_history_cursor(data['cursor'])
+            notifications = notifications.filter(or_(
+                cls.last_update_ts < last_update_ts,
+                and_(cls.last_update_ts == last_update_ts, cls.id < obj_id)
+            ))
+
+        # One extra row shows whether the next page exists
+        notifications = notifications.limit(page_size + 1).all()
+        next_cursor = cls.encode_history_cursor(notifications[page_size - 1]) if len(notifications) > page_size else None
+
+        notifications_list = [serialize(notification) for notification in notifications[:page_size]]
+        env_statistics = cls.history_statistics(data)
+
+        logger.info("Objects found: %s. Time spend (seconds): %s", len(notifications_list), int(time.time() - job_start_ts), extra={'event': 'history_result', 'body': data})
+
+        return {"notifications": notifications_list, "notification_statistics": env_statistics, "next_cursor": next_cursor}
+
+    @classmethod
+    @read_only
+    def history_stream(cls, data):
+        """
+        Yields history rows in NDJSON format without loading the whole result to memory
+        """
+        notifications, serialize = cls.history_rows(data)
+        for notification in notifications.yield_per(HISTORY_EXPORT_BATCH_SIZE):
+            yield json.dumps(serialize(notification)) + '\n'
 
     @classmethod
     def update_exist_event(cls, event_id: int, data: dict):
         cls.query.filter_by(id=event_id).update(data)
+        if set(data) & set(cls.search_columns):
+            search_index.reindex([event_id])
         db.session.commit()
+        cls.changed([event_id])
+
+
+class NotificationSearchTrigrams(db.Model):
+    __tablename__ = 'notification_search_trigrams'
+    __table_args__ = (
+        db.Index('ix_notification_search_trigrams_trigram_notification_id', 'trigram', 'notification_id'),
+        db.Index('ix_notification_search_trigrams_notification_id', 'notification_id'),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    trigram = db.Column(db.String(3), nullable=False)
+    notification_id = db.Column(db.Integer, nullable=False)
+
+
+active_notifications_index = ActiveNotificationsIndex(Notifications, rebuild_seconds=ACTIVE_NOTIFICATIONS_REBUILD_SECONDS)
+search_index = TrigramSearchIndex(
+    Notifications, NotificationSearchTrigrams,
+    columns=Notifications.search_columns,
+    lookback_ids=HISTORY_SEARCH_INDEX_LOOKBACK_IDS,
+    batch_size=HISTORY_SEARCH_INDEX_BATCH_SIZE,
+    max_trigrams=HISTORY_SEARCH_MAX_TRIGRAMS,
+    max_candidates=HISTORY_SEARCH_MAX_CANDIDATES
+)
 
 
 class ActiveAlerts(db.Model):
@@ -544,8 +857,7 @@ class ActiveAlerts(db.Model):
 
     @classmethod
     def get_active_event_by_id(cls, event_id):
-        db.session.commit()
-        queries = cls.query.filter_by(alert_id=event_id).all()
+        queries = fresh_query(cls).filter_by(alert_id=event_id).all()
 
         return queries
 
@@ -570,7 +882,7 @@ class ActiveAlerts(db.Model):
     def delete_exist_event(cls, event_id: int):
         cls.query.filter_by(alert_id=event_id).delete()
         db.session.commit()
-        logger.info(msg=f"Row with alert_id: {event_id} has been removed.")
+        logger.info("Row with alert_id: %s has been removed.", event_id)
 
 
 class UsersDB(db.Model):
@@ -611,7 +923,7 @@ class UsersDB(db.Model):
             expires = datetime.timedelta(hours=TOKEN_EXPIRE_HOURS)
         access_token = create_access_token(identity=username, expires_delta=expires)
         refresh_token = create_refresh_token(identity=username, expires_delta=expires)
-        logger.info(msg=f"User login: {username}")
+        logger.info("User login: %s", username)
         user.last_login_ts = func.now()
         db.session.commit()
         return {
@@ -688,6 +1000,9 @@ class UsersDB(db.Model):
 
 class ActionsHistory(db.Model):
     __tablename__ = 'actions_history'
+    __table_args__ = (
+        db.Index('ix_actions_history_obj_id', 'obj_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.VARCHAR(50))
     obj_type = db.Column(db.VARCHAR(50))
@@ -776,10 +1091,19 @@ class Statistics(db.Model):
         cls.query.filter_by(alert_id=event_id).update(data)
         db.session.commit()
 
+    @classmethod
+    def increment(cls, alert_ids: list, column: str, commit=True):
+        """
+        Atomically increments the counter column for all provided alerts with a single UPDATE
+        """
+        cls.query.filter(cls.alert_id.in_(alert_ids))\
+            .update({column: getattr(cls, column) + 1}, synchronize_session=False)
+        if commit:
+            db.session.commit()
+
     @classmethod
     def get_counter(cls, event_id: int):
-        db.session.commit()
-        query = cls.query.filter_by(alert_id=event_id).one_or_none()
+        query = fresh_query(cls).filter_by(alert_id=event_id).one_or_none()
 
         return query
 
@@ -820,8 +1144,7 @@ class Assign(db.Model):
 
     @classmethod
     def get_assign_info(cls, event_id: int):
-        db.session.commit()
-        query = cls.query.filter_by(alert_id=event_id).all()
+        query = fresh_query(cls).filter_by(alert_id=event_id).all()
 
         return query
 
@@ -835,7 +1158,7 @@ class Assign(db.Model):
     def delete_exist_event(cls, event_id: int):
         cls.query.filter_by(alert_id=event_id).delete()
         db.session.commit()
-        logger.info(msg=f"Row with alert_id: {event_id} has been removed.")
+        logger.info("Row with alert_id: %s has been removed.", event_id)
 
     @classmethod
     def obj_exist(cls, obj_id):
@@ -851,6 +1174,9 @@ class Assign(db.Model):
 
 
 class Storage(db.Model):
+    __table_args__ = (
+        db.Index('ix_storage_item_type', 'item_type'),
+    )
 
     id = db.Column(db.Integer, nullable=False, primary_key=True)
     item_type = db.Column(db.VARCHAR(40), nullable=False)
@@ -890,3 +1216,105 @@ class Storage(db.Model):
         else:
             return []
 
+
+
+class BulkAction(object):
+    """
+    Applies one operator action to a list of alerts within a single transaction.
+    Every step is a set-based statement over all alert ids, the changes are committed once on exit
+    and rolled back if any step fails.
+    """
+    def __init__(self, alert_ids: list, username: str):
+        self.alert_ids = [int(alert_id) for alert_id in alert_ids]
+        self.username = username
+        self._current_outputs = None
+        self._studios = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            db.session.commit()
+            mark_written()
+            Notifications.changed(self.alert_ids)
+        else:
+            db.session.rollback()
+        return False
+
+    @property
+    def current_outputs(self):
+        if self._current_outputs is None:
+            self._current_outputs = Notifications.current_outputs(self.alert_ids)
+        return self._current_outputs
+
+    @property
+    def studios(self):
+        if self._studios is None:
+            self._studios = Notifications.studio_ids(self.alert_ids)
+        return self._studios
+
+    def update_active_alerts(self, data: dict):
+        ActiveAlerts.query.filter(ActiveAlerts.alert_id.in_(self.alert_ids))\
+            .update(data, synchronize_session=False)
+
+    def delete_active_alerts(self):
+        ActiveAlerts.query.filter(ActiveAlerts.alert_id.in_(self.alert_ids)).delete(synchronize_session=False)
+        logger.info("Rows with alert_ids: %s have been removed.", self.alert_ids)
+
+    def update_notifications(self, data: dict):
+        Notifications.query.filter(Notifications.id.in_(self.alert_ids))\
+            .update(data, synchronize_session=False)
+
+    def update_notifications_status(self, notification_status):
+        self.update_notifications({'notification_status': notification_status, 'last_update_ts': func.now()})
+        logger.info("Changing notification status of alerts: %s", self.alert_ids)
+
+    def increment_counter(self, column: str):
+        Statistics.increment(self.alert_ids, column, commit=False)
+
+    def replace_assign(self, body: dict):
+        Assign.query.filter(Assign.alert_id.in_(self.alert_ids)).delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(Assign, [{**body, 'alert_id': alert_id} for alert_id in self.alert_ids])
+
+    def delete_assign(self):
+        """
+        Removes assign rows and returns ids of the alerts which were assigned
+        """
+        assigned_ids = [
+            row.alert_id for row in db.session.query(Assign.alert_id).filter(Assign.alert_id.in_(self.alert_ids)).all()
+        ]
+        if assigned_ids:
+            Assign.query.filter(Assign.alert_id.in_(assigned_ids)).delete(synchronize_session=False)
+        return assigned_ids
+
+    def add_notification_history(self, notification_action: str, comments: dict, with_output=True, alert_ids=None):
+        alert_ids = self.alert_ids if alert_ids is None else alert_ids
+        history_events = []
+        for alert_id in alert_ids:
+            event = {
+                'alert_id': alert_id,
+                'notification_action': notification_action,
+                'comments': json.dumps(comments),
+                'time_stamp': datetime.datetime.utcnow()
+            }
+            if with_output:
+                event['notification_output'] = self.current_outputs.get(alert_id, "")
+            history_events.append(event)
+        db.session.bulk_insert_mappings(NotificationHistory, history_events)
+
+    def add_actions_history(self, name: str, notes, alert_ids=None):
+        """
+        notes can be a single string for all alerts or a dictionary with notes per alert id
+        """
+        alert_ids = self.alert_ids if alert_ids is None else alert_ids
+        db.session.bulk_insert_mappings(ActionsHistory, [
+            {
+                'name': name,
+                'obj_type': 'alert',
+                'obj_id': alert_id,
+                'username': self.username,
+                'notes': notes[alert_id] if isinstance(notes, dict) else notes,
+                'created_ts': datetime.datetime.now()
+            } for alert_id in alert_ids
+        ])
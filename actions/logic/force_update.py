@@ -1,51 +1,151 @@
+import atexit
 import json
+import os
+import queue
+import threading
+import time
+from actions.app import app
 from actions.logic.db import Notifications
 import actions.settings as settings
-import requests
+from actions.tools.http_client import bridge_client
+from actions.tools.prometheus_metrics import Prom
 import logging
 import traceback
 
 logger = logging.getLogger('default')
 
+# Queue item asking to refresh the bridge cache once the force update of its batch is sent
+UPDATE_CACHE = 'update_cache'
 
-class ForceUpdate(object):
-    def __init__(self, alert_ids: list):
-        self.alert_ids = alert_ids
 
-    def get_alert_details(self):
-        alert_list = []
+class ForceUpdateDispatcher(object):
+    """
+    Sends force update requests to harp-bridge from a background thread.
+    Alert ids received within the coalesce window are de-duplicated and sent in one request.
+    Ids which don't fit into the queue are dropped and counted, queued ids are sent on process exit.
+    Cache update requests of a batch are coalesced into one call after its force update.
+    """
+    def __init__(self, coalesce_seconds=settings.FORCE_UPDATE_COALESCE_SECONDS,
+                 retries=settings.FORCE_UPDATE_RETRIES, backoff_seconds=settings.FORCE_UPDATE_BACKOFF_SECONDS,
+                 queue_size=settings.FORCE_UPDATE_QUEUE_SIZE):
+        self.coalesce_seconds = coalesce_seconds
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def submit(self, alert_ids: list, update_cache=False):
+        self._ensure_worker()
+        dropped = 0
+        items = [int(alert_id) for alert_id in alert_ids] + ([UPDATE_CACHE] if update_cache else [])
+        for item in items:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            Prom.force_updates_dropped.inc(dropped)
+            logger.warning("Force update queue is full, %s alerts are dropped", dropped)
+
+    def _ensure_worker(self):
+        with self._lock:
+            # The worker is started lazily and restarted in forked processes
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='force-update-dispatcher', daemon=True)
+                self._thread.start()
 
-        for single_alert in self.alert_ids:
-            alert = Notifications.obj_exist(single_alert)
+    def _collect_batch(self):
+        items = {self._queue.get()}
+        deadline = time.time() + self.coalesce_seconds
+        while True:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                items.add(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return items
 
-            if alert:
-                alert_details = {
-                    'studio_id': alert.json_self()['studio_id'],
-                    'alert_id': single_alert
-                }
-                alert_list.append(alert_details)
+    def _run(self):
+        while True:
+            self._send(self._collect_batch())
 
-        return alert_list
+    def _send(self, items: set):
+        alert_ids = sorted(item for item in items if item != UPDATE_CACHE)
+        if alert_ids:
+            try:
+                with app.app_context():
+                    data = self.get_alert_details(alert_ids)
+                self.post_update(data)
+            except Exception as err:
+                logger.error(msg=f"Can`t force update - {alert_ids}\nError: {err}\nTrace: {traceback.format_exc()}")
+        if UPDATE_CACHE in items:
+            self.update_cache()
 
-    def post_update(self):
-        data = self.get_alert_details()
-        url = f"http://{settings.BRIDGE_HOST}/api/v1/bridge/force_update"
-        logger.info(msg=f"Received request to alert force update:\nURL: {url}\nData: {data}")
+    def flush(self):
+        """
+        Sends queued alert ids from the calling thread, called on worker exit
+        """
+        # A forked process without its own worker holds a copy of the parent queue
+        if self._pid != os.getpid():
+            return
+        items = set()
+        while True:
+            try:
+                items.add(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if items:
+            self._send(items)
+
+    @staticmethod
+    def get_alert_details(alert_ids: list):
+        studio_ids = Notifications.studio_ids(alert_ids)
+
+        return [{'studio_id': studio_ids[alert_id], 'alert_id': alert_id} for alert_id in alert_ids if alert_id in studio_ids]
+
+    def post_update(self, data: list):
+        if not data:
+            return
+        logger.info("Received request to alert force update", extra={'event': 'force_update', 'body': data})
         try:
-            req = requests.post(
+            req = bridge_client.post(
+                '/api/v1/bridge/force_update',
                 data=json.dumps(data),
-                url=url,
                 headers={"Accept": "application/json", "Content-Type": "application/json"},
-                timeout=10
+                retries=self.retries,
+                backoff_seconds=self.backoff_seconds
             )
             if req.status_code == 200:
-                logger.info(msg=f"Force update was successful - {data}")
+                logger.info("Force update was successful", extra={'event': 'force_update_done', 'body': data})
             else:
-                logger.error(msg=f"Can`t force update - {data}")
+                logger.error(msg=f"Can`t force update - {data}. Status code: {req.status_code}")
         except Exception as err:
-            logger.error(msg=f"Can`t force update - {data}\nError: {err}\nTrace: {traceback.format_exc()}")
-            return {'msg': None}
+            logger.error(msg=f"Can`t force update - {data}\nError: {err}")
 
-    def main(self):
-        self.post_update()
+    def update_cache(self):
+        try:
+            result = bridge_client.get(
+                '/api/v1/bridge-actions/update_cache/0', retries=self.retries, backoff_seconds=self.backoff_seconds
+            ).json()
+            logger.info("Bridge cache was updated", extra={'event': 'update_cache_done', 'body': result})
+        except Exception as err:
+            logger.error(msg=f"Can`t update bridge cache. Error: {err}")
+
+
+force_update_dispatcher = ForceUpdateDispatcher()
+
+
+class ForceUpdate(object):
+    def __init__(self, alert_ids: list):
+        self.alert_ids = alert_ids
 
+    def main(self, update_cache=False):
+        force_update_dispatcher.submit(self.alert_ids, update_cache=update_cache)
@@ -1,12 +1,83 @@
 import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
 from jira import JIRA
 import jira.exceptions as jira_exceptions
 import actions.settings as settings
-import os
 
 logger = logging.getLogger('default')
 
 
+class JiraClientPool(object):
+    """
+    Long-lived Jira clients shared by all threads. Clients are created lazily up to the pool size,
+    each one is used by a single thread at a time, so its authenticated session and connections are reused.
+    """
+    def __init__(self, size=settings.JIRA_POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @staticmethod
+    def _new_client():
+        proxies = {'http': settings.JIRA_PROXY, 'https': settings.JIRA_PROXY} if settings.JIRA_PROXY else None
+        # Server info is not requested by the constructor, so nothing is sent before the session is configured
+        jira = JIRA(
+            options={'server': settings.JIRA_SERVER, 'verify': False},
+            basic_auth=(settings.JIRA_USER, settings.JIRA_PASSWORD),
+            timeout=settings.JIRA_TIMEOUT,
+            proxies=proxies,
+            get_server_info=False
+        )
+        if not proxies:
+            # Instead of clearing https_proxy for the whole process
+            jira._session.trust_env = False
+        return jira
+
+    def _acquire(self):
+        with self._lock:
+            # Clients are not shared with forked processes
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue()
+                self._created = 0
+                self._pid = os.getpid()
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+
+        if not create:
+            try:
+                return self._idle.get(timeout=settings.JIRA_TIMEOUT)
+            except queue.Empty:
+                raise jira_exceptions.JIRAError(
+                    text=f"No Jira client is available within {settings.JIRA_TIMEOUT} seconds, all {self.size} are in use"
+                )
+        try:
+            return self._new_client()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def client(self):
+        jira = self._acquire()
+        try:
+            yield jira
+        finally:
+            self._idle.put(jira)
+
+
+jira_pool = JiraClientPool()
+
+
 class GenerateJira(object):
     def __init__(self, reporter=None, procedure_name='', procedure_id=None, jira_id=None):
         self.reporter = reporter
@@ -18,13 +89,18 @@ class GenerateJira(object):
         self.component_id = settings.JIRA_ONGOING_TASK_COMPONENT_ID
         self.category = settings.JIRA_STUDIO_SUPPORT_COMPONENT_ID
         self.epic = settings.JIRA_EPIC
-        os.environ['https_proxy'] = ''
-        os.environ['http_proxy'] = ''
-        self.jira = JIRA(
-            options={'server': settings.JIRA_SERVER, 'verify': False},
-            basic_auth=(settings.JIRA_USER, settings.JIRA_PASSWORD),
-            timeout=settings.JIRA_TIMEOUT
-        )
+
+    @staticmethod
+    def add_watchers(jira, jira_id, watchers: list):
+        """
+        Adds all watchers in one pass over the same session, Jira API has no bulk endpoint for watchers.
+        A watcher which can't be added doesn't fail the issue creation.
+        """
+        for watcher in dict.fromkeys(watchers):
+            try:
+                jira.add_watcher(jira_id, watcher)
+            except jira_exceptions.JIRAError as err:
+                logger.warning(msg=f"Can't add watcher {watcher} to Jira {jira_id}. Error: {err}")
 
     def create_jira(self):
         watchers = f"[~{self.reporter}] " + " ".join([f"[~{watcher}]" for watcher in self.watchers])
@@ -32,7 +108,7 @@ class GenerateJira(object):
             'project': {'key': 'JIRAP'},
             'summary': f"New Harp procedure to approve: {self.procedure_name}",
             'description': f""" New procedure is waiting for review: http://harpia.io/#/procedure/edit/{self.procedure_id}
-            The task was automatically created by Harp Actions service. Please contact Support team if you have any 
+            The task was automatically created by Harp Actions service. Please contact Support team if you have any
             questions. FYI {watchers} """,
             'customfield_10200': self.epic,
             'customfield_11019': {"id": self.category},
@@ -41,13 +117,11 @@ class GenerateJira(object):
             'issuetype': {'name': 'Task'}
         }
 
-        self.jira_id = self.jira.create_issue(fields=jira_body)
-        if self.reporter != 'me_auto':
-            self.jira.add_watcher(self.jira_id, self.reporter)
-        for watcher in self.watchers:
-            self.jira.add_watcher(self.jira_id, watcher)
-
-        self.jira.transition_issue(self.jira_id, self.todo_issue_id)
+        with jira_pool.client() as jira:
+            self.jira_id = jira.create_issue(fields=jira_body)
+            reporter = [self.reporter] if self.reporter != 'me_auto' else []
+            self.add_watchers(jira, self.jira_id, reporter + list(self.watchers))
+            jira.transition_issue(self.jira_id, self.todo_issue_id)
 
         logger.info(
             msg=f"JIRA has been created: {self.jira_id}. Procedure: http://harpia.io/#/procedure/edit/{self.procedure_id}"
@@ -55,29 +129,13 @@ class GenerateJira(object):
 
         return str(self.jira_id)
 
-    def check_jira_status(self):
-        print(self.jira_id)
-        try:
-            jira_obj = self.jira.issue(self.jira_id)
-            status = jira_obj.fields.status.name
-        except jira_exceptions.JIRAError as jira_ext:
-            # TODO Add prometheus metric
-            if jira_ext.status_code == 404:
-                logger.warning(
-                    msg=f"The Jira is not found. ID: {self.jira_id}"
-                )
-                return True
-            logger.error(
-                msg=f"Jira exception. ID: {self.jira_id}"
+    def issue_statuses(self, jira_ids: list):
+        """
+        Status names of issues by key with a single JQL query. Issues which don't exist are not returned.
+        """
+        keys = ', '.join([f'"{jira_id}"' for jira_id in jira_ids])
+        with jira_pool.client() as jira:
+            issues = jira.search_issues(
+                f"key in ({keys})", startAt=0, maxResults=len(jira_ids), fields='status', validate_query=False
             )
-            return False
-        except Exception as exc:
-            # TODO Add prometheus metric
-            logger.warning(
-                msg=f"The Jira is not found. ID: {self.jira_id}"
-            )
-            return False
-        else:
-            return status == 'Closed'
-
-
+        return {issue.key: issue.fields.status.name for issue in issues}
@@ -0,0 +1,152 @@
+import datetime
+import logging
+from sqlalchemy import inspect, text
+from actions.logic.db import db
+
+logger = logging.getLogger('default')
+
+
+class SchemaMigrations(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(255), nullable=False)
+    applied_ts = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, nullable=False)
+
+
+class Migration(object):
+    def __init__(self, version: int, description: str, upgrade):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+
+def create_indexes(connection, indexes: list):
+    """
+    Runs DDL of (table, index name, DDL) items whose index doesn't exist in the database yet.
+    Tables created by create_all already have the indexes of the current models.
+    """
+    inspector = inspect(connection)
+    for table, name, ddl in indexes:
+        if name not in [index['name'] for index in inspector.get_indexes(table)]:
+            connection.execute(text(ddl))
+            logger.info(msg=f"Index {name} has been created on {table}.")
+
+
+def create_tables(connection, tables: list):
+    """
+    Runs DDL of (table name, DDL statements) items whose table doesn't exist in the database yet
+    """
+    inspector = inspect(connection)
+    for table, statements in tables:
+        if inspector.has_table(table):
+            continue
+        for ddl in statements:
+            connection.execute(text(ddl))
+        logger.info(msg=f"Table {table} has been created.")
+
+
+def create_search_trigrams(connection):
+    """
+    Trigram table for history pattern search. Trigrams are compared with the collation of the searched
+    columns, otherwise the index would miss rows which LIKE matches, e.g. in another letter case.
+    """
+    create_tables(connection, [
+        ('notification_search_trigrams', [
+            "CREATE TABLE notification_search_trigrams ("
+            "id BIGINT NOT NULL AUTO_INCREMENT, "
+            "trigram VARCHAR(3) NOT NULL, "
+            "notification_id INTEGER NOT NULL, "
+            "PRIMARY KEY (id))",
+            "CREATE INDEX ix_notification_search_trigrams_trigram_notification_id "
+            "ON notification_search_trigrams (trigram, notification_id)",
+            "CREATE INDEX ix_notification_search_trigrams_notification_id "
+            "ON notification_search_trigrams (notification_id)",
+        ]),
+    ])
+    if connection.dialect.name != 'mysql':
+        return
+    collations = connection.execute(text(
+        "SELECT DISTINCT CHARACTER_SET_NAME, COLLATION_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'notifications' "
+        "AND COLUMN_NAME IN ('service', 'source', 'object_name', 'name', 'ms')"
+    )).all()
+    if len(collations) != 1:
+        logger.error(msg=f"Searched columns of notifications have different collations {collations}, "
+                         "set HISTORY_SEARCH_MODE=like")
+        return
+    charset, collation = collations[0]
+    connection.execute(text(
+        f"ALTER TABLE notification_search_trigrams MODIFY trigram VARCHAR(3) "
+        f"CHARACTER SET {charset} COLLATE {collation} NOT NULL"
+    ))
+
+
+# Released migrations must not be changed, schema changes are added as new versions
+MIGRATIONS = [
+    Migration(
+        version=1,
+        description='Indexes for history, timeline, active notifications, actions history and storage queries',
+        upgrade=lambda connection: create_indexes(connection, [
+            ('notification_history', 'ix_notification_history_alert_id_time_stamp',
+             "CREATE INDEX ix_notification_history_alert_id_time_stamp ON notification_history (alert_id, time_stamp DESC)"),
+            ('notifications', 'ix_notifications_source_notification_status',
+             "CREATE INDEX ix_notifications_source_notification_status ON notifications (source, notification_status)"),
+            ('notifications', 'ix_notifications_object_name_notification_status',
+             "CREATE INDEX ix_notifications_object_name_notification_status ON notifications (object_name, notification_status)"),
+            ('notifications', 'ix_notifications_last_update_ts_id',
+             "CREATE INDEX ix_notifications_last_update_ts_id ON notifications (last_update_ts, id)"),
+            ('actions_history', 'ix_actions_history_obj_id',
+             "CREATE INDEX ix_actions_history_obj_id ON actions_history (obj_id)"),
+            ('storage', 'ix_storage_item_type',
+             "CREATE INDEX ix_storage_item_type ON storage (item_type)"),
+        ])
+    ),
+    Migration(
+        version=2,
+        description='Trigram table for history pattern search',
+        upgrade=create_search_trigrams
+    ),
+]
+
+
+def applied_versions(connection):
+    return {row[0] for row in connection.execute(text(f"SELECT version FROM {SchemaMigrations.__tablename__}"))}
+
+
+def run_migrations(engine=None):
+    """
+    Applies pending migrations in version order. On MySQL a named lock keeps concurrent workers
+    from running the same migration twice.
+    """
+    engine = engine or db.engine
+    SchemaMigrations.__table__.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        locked = engine.dialect.name == 'mysql'
+        if locked and connection.execute(text("SELECT GET_LOCK('harp_actions_migrations', 300)")).scalar() != 1:
+            raise RuntimeError("Can't acquire harp_actions_migrations lock, migrations are not applied")
+        try:
+            done = applied_versions(connection)
+            for migration in sorted(MIGRATIONS, key=lambda item: item.version):
+                if migration.version in done:
+                    continue
+                logger.info(msg=f"Applying migration {migration.version}: {migration.description}")
+                with connection.begin():
+                    migration.upgrade(connection)
+                    connection.execute(SchemaMigrations.__table__.insert().values(
+                        version=migration.version,
+                        description=migration.description,
+                        applied_ts=datetime.datetime.utcnow()
+                    ))
+        finally:
+            if locked:
+                connection.execute(text("SELECT RELEASE_LOCK('harp_actions_migrations')"))
+
+
+def main():
+    from actions.app import app
+    db.init_app(app)
+    db.app = app
+    with app.app_context():
+        db.create_all()
+        run_migrations()
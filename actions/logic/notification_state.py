@@ -12,32 +12,32 @@ def time_to_seconds(input_time):
 
 def add_notification_state(alert_body):
     try:
-        logger.info(f"Alert Details: {alert_body}")
+        logger.debug("Alert Details: %s", alert_body)
         if time_to_seconds(alert_body['snooze_expire_ts']) < time_to_seconds(datetime.now()) and \
                 int(alert_body['acknowledged']) == 0 and \
                 int(alert_body['assign_status']) == 0 and \
                 time_to_seconds(alert_body['handle_expire_ts']) < time_to_seconds(datetime.now()):
-            logger.info("Alert is ACTIVE")
+            logger.debug("Alert is ACTIVE")
             return 'active'
 
         elif time_to_seconds(alert_body['snooze_expire_ts']) >= time_to_seconds(datetime.now()):
-            logger.info("Alert is SNOOZED")
+            logger.debug("Alert is SNOOZED")
             return 'snoozed'
 
         elif int(alert_body['acknowledged']) != 0:
-            logger.info("Alert is ACKNOWLEDGED")
+            logger.debug("Alert is ACKNOWLEDGED")
             return 'acknowledged'
 
         elif time_to_seconds(alert_body['downtime_expire_ts']) >= time_to_seconds(datetime.now()):
-            logger.info("Alert is in DOWNTIME")
+            logger.debug("Alert is in DOWNTIME")
             return 'in_downtime'
 
         elif int(alert_body['assign_status']) == 1:
-            logger.info("Alert is ASSIGNED")
+            logger.debug("Alert is ASSIGNED")
             return 'assigned'
 
         elif time_to_seconds(alert_body['handle_expire_ts']) >= time_to_seconds(datetime.now()):
-            logger.info("Alert is HANDLED")
+            logger.debug("Alert is HANDLED")
             return 'handled'
 
         else:
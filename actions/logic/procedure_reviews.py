@@ -0,0 +1,48 @@
+import logging
+import time
+from sqlalchemy import text
+from actions.logic.db import db, Procedures
+from actions.logic.jira import GenerateJira
+import actions.settings as settings
+
+logger = logging.getLogger('default')
+
+LOCK_NAME = 'harp_actions_procedure_reviews'
+
+
+def closed_reviews(jira, jira_ids: list):
+    """
+    Review Jiras which are closed or don't exist anymore
+    """
+    closed = []
+    for idx in range(0, len(jira_ids), settings.JIRA_RECONCILE_BATCH_SIZE):
+        batch = jira_ids[idx:idx + settings.JIRA_RECONCILE_BATCH_SIZE]
+        try:
+            statuses = jira.issue_statuses(batch)
+        except Exception as err:
+            logger.error(msg=f"Can't check status of review Jiras: {batch}. Error: {err}")
+            continue
+        closed.extend([jira_id for jira_id in batch if statuses.get(jira_id, 'Closed') == 'Closed'])
+    return closed
+
+
+def reconcile_review_statuses():
+    """
+    Clears procedure_review_status of procedures which review Jira is closed.
+    On MySQL a named lock lets only one worker process run it at a time.
+    """
+    with db.engine.connect() as lock_connection:
+        locked = db.engine.dialect.name == 'mysql'
+        if locked and lock_connection.execute(text(f"SELECT GET_LOCK('{LOCK_NAME}', 0)")).scalar() != 1:
+            return
+        try:
+            job_start_ts = time.time()
+            jira_ids = Procedures.pending_review_ids()
+            if not jira_ids:
+                return
+            closed = closed_reviews(GenerateJira(), jira_ids)
+            Procedures.clear_review_status(closed)
+            logger.info(msg=f"Review Jiras checked: {len(jira_ids)}, closed: {closed}. Time spend (seconds): {int(time.time() - job_start_ts)}")
+        finally:
+            if locked:
+                lock_connection.execute(text(f"SELECT RELEASE_LOCK('{LOCK_NAME}')"))
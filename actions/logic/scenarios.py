@@ -1,36 +1,66 @@
 import actions.settings as settings
 import logging
-import requests
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from actions.tools.cache import TTLCache
+from actions.tools.http_client import scenarios_client
 
 logger = logging.getLogger('default')
 
+scenario_cache = TTLCache(
+    name='scenarios', ttl=settings.SCENARIOS_CACHE_TTL_SECONDS, max_size=settings.SCENARIOS_CACHE_MAX_SIZE
+)
+
+
+def request_scenario_by_id(scenario_id):
+    req = scenarios_client.get(
+        f"/{scenario_id}",
+        headers={"Accept": "application/json", "Content-Type": "application/json"}
+    )
+    if req.status_code == 200:
+        logger.debug(msg=f"Requested Scenario by ID - {scenario_id}")
+        return req.json()['msg']
+    elif req.status_code == 404:
+        logger.info(msg=f"Requested Scenario by ID is not found - {scenario_id}")
+        return None
+    else:
+        raise Exception(f"Can`t connect to Scenario service to get Scenario by ID - {scenario_id}\nStatus code: {req.status_code}\nBody: {req.text}")
+
 
 def get_scenario_by_id(scenario_id):
-    url = f"{settings.SCENARIOS_HOST}/{int(scenario_id)}"
+    scenario_id = int(scenario_id)
     try:
-        req = requests.get(
-            url=url,
-            headers={"Accept": "application/json", "Content-Type": "application/json"},
-            timeout=10
-        )
-        if req.status_code == 200:
-            logger.info(
-                msg=f"Requested Scenario by ID - {scenario_id}\nReceived response: {req.json()}"
-            )
-            return req.json()['msg']
-        elif req.status_code == 404:
-            logger.info(
-                msg=f"Requested Scenario by ID is not found - {scenario_id}\nReceived response: {req.json()}"
-            )
-            return None
-        else:
-            logger.error(
-                msg=f"Can`t connect to Scenario service to get Scenario by ID - {int(scenario_id)}\nStatus code: {req.status_code}\nJSON: {req.json()}"
-            )
-            return None
+        return scenario_cache.get_or_load(scenario_id, lambda: request_scenario_by_id(scenario_id))
     except Exception as err:
         logger.error(
             msg=f"Error: {err}, stack: {traceback.format_exc()}"
         )
         return None
+
+
+def get_scenarios_by_ids(scenario_ids: list):
+    """
+    Returns dictionary of scenarios by id for views of many alerts. Scenario service returns one scenario
+    per request, so ids are de-duplicated, cached scenarios are served from memory and missing ones
+    are requested concurrently.
+    """
+    scenarios = {}
+    missing = []
+    for scenario_id in set(int(scenario_id) for scenario_id in scenario_ids):
+        scenario = scenario_cache.get(scenario_id)
+        if scenario is None:
+            missing.append(scenario_id)
+        else:
+            scenarios[scenario_id] = scenario
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(settings.SCENARIOS_FETCH_WORKERS, len(missing))) as executor:
+            for scenario_id, scenario in zip(missing, executor.map(get_scenario_by_id, missing)):
+                scenarios[scenario_id] = scenario
+
+    return scenarios
+
+
+def invalidate_scenario(scenario_id):
+    scenario_cache.invalidate(int(scenario_id))
+
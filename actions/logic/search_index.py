@@ -0,0 +1,156 @@
+import logging
+import re
+import time
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import aliased
+
+logger = logging.getLogger('default')
+
+# Wildcards and the escape character of LIKE, trigrams are only taken from literal parts of a pattern
+LIKE_SPECIAL = re.compile(r'[%_\\]')
+
+
+def trigrams(value):
+    """
+    Distinct three character substrings of the value
+    """
+    if not value:
+        return set()
+    return {value[position:position + 3] for position in range(len(value) - 2)}
+
+
+def pattern_trigrams(pattern):
+    """
+    Trigrams which every value matching LIKE '%pattern%' contains, in pattern order
+    """
+    found = []
+    for literal in LIKE_SPECIAL.split(pattern):
+        for position in range(len(literal) - 2):
+            trigram = literal[position:position + 3]
+            if trigram not in found:
+                found.append(trigram)
+    return found
+
+
+class TrigramSearchIndex(object):
+    """
+    Trigrams of the searchable columns of notifications, kept in a table of (trigram, notification_id) rows.
+    The trigram column has the collation of notifications, so a value matching LIKE '%pattern%' always has
+    every trigram of the pattern, and the index only narrows down the rows the LIKE filter checks.
+
+    Notifications are inserted by other services, new ones are indexed by a periodic sync over the id.
+    Ids above the indexed ones minus lookback_ids are never searched in the index, the LIKE filter checks
+    them directly, so search results don't depend on how far the sync got. Rows committed later than
+    lookback_ids newer rows are not indexed. Searchable columns are the unique key of a notification
+    and are not updated by other services, changes made by this service are applied with reindex.
+    """
+    def __init__(self, model, trigram_model, columns: list, lookback_ids: int, batch_size: int,
+                 max_trigrams: int, max_candidates: int):
+        self.model = model
+        self.trigram_model = trigram_model
+        self.columns = columns
+        self.lookback_ids = lookback_ids
+        self.batch_size = batch_size
+        self.max_trigrams = max_trigrams
+        self.max_candidates = max_candidates
+
+    @property
+    def session(self):
+        return self.model.query.session
+
+    def _rows(self, notifications):
+        rows = []
+        for notification in notifications:
+            found = set()
+            for column in self.columns:
+                found |= trigrams(getattr(notification, column))
+            rows.extend({'trigram': trigram, 'notification_id': notification.id} for trigram in found)
+        return rows
+
+    def _insert(self, notifications):
+        rows = self._rows(notifications)
+        if rows:
+            self.session.execute(self.trigram_model.__table__.insert(), rows)
+
+    def _select_notifications(self):
+        return self.session.query(self.model.id, *[getattr(self.model, column) for column in self.columns])
+
+    def max_indexed_id(self):
+        return self.session.query(func.max(self.trigram_model.notification_id)).scalar() or 0
+
+    def sync(self):
+        """
+        Indexes notifications which are not indexed yet, starting lookback_ids below the newest indexed one.
+        Every worker runs the sync, on MySQL a named lock on a separate connection lets one of them do the work.
+        """
+        engine = self.session.get_bind()
+        locked = engine.dialect.name == 'mysql'
+        with engine.connect() as lock_connection:
+            if locked and lock_connection.execute(text("SELECT GET_LOCK('harp_actions_search_index', 0)")).scalar() != 1:
+                return
+            try:
+                self._sync()
+            finally:
+                if locked:
+                    lock_connection.execute(text("SELECT RELEASE_LOCK('harp_actions_search_index')"))
+
+    def _sync(self):
+        job_start_ts = time.time()
+        indexed_count = 0
+        after_id = max(0, self.max_indexed_id() - self.lookback_ids)
+        indexed = {row[0] for row in self.session.query(self.trigram_model.notification_id).filter(
+            self.trigram_model.notification_id > after_id
+        ).distinct()}
+        while True:
+            notifications = self._select_notifications().filter(self.model.id > after_id).\
+                order_by(self.model.id).limit(self.batch_size).all()
+            if not notifications:
+                break
+            new = [notification for notification in notifications if notification.id not in indexed]
+            self._insert(new)
+            self.session.commit()
+            indexed_count += len(new)
+            after_id = notifications[-1].id
+            if len(notifications) < self.batch_size:
+                break
+        self.session.commit()
+        if indexed_count:
+            logger.info("Search index: %s notifications indexed. Time spend (seconds): %s",
+                        indexed_count, int(time.time() - job_start_ts))
+
+    def reindex(self, obj_ids: list):
+        """
+        Replaces trigrams of notifications changed by this service, must be called before the commit
+        """
+        obj_ids = [int(obj_id) for obj_id in obj_ids]
+        if not obj_ids:
+            return
+        self.trigram_model.query.filter(self.trigram_model.notification_id.in_(obj_ids)).\
+            delete(synchronize_session=False)
+        self._insert(self._select_notifications().filter(self.model.id.in_(obj_ids)).all())
+
+    def candidate_filter(self, pattern):
+        """
+        Filter of notification ids which may match the pattern, None if the index can't narrow it down:
+        the pattern has no trigrams or matches more than max_candidates indexed notifications
+        """
+        searched = pattern_trigrams(pattern)
+        if not searched:
+            return None
+        # Trigrams spread over the pattern, every one of them is a join
+        step = max(1, len(searched) // self.max_trigrams)
+        searched = searched[::step][:self.max_trigrams]
+
+        indexed_up_to = self.max_indexed_id() - self.lookback_ids
+        tables = [aliased(self.trigram_model) for _ in searched]
+        candidates = self.session.query(tables[0].notification_id).filter(
+            tables[0].trigram == searched[0],
+            tables[0].notification_id <= indexed_up_to
+        )
+        for table, trigram in zip(tables[1:], searched[1:]):
+            candidates = candidates.join(table, table.notification_id == tables[0].notification_id).\
+                filter(table.trigram == trigram)
+        obj_ids = [row[0] for row in candidates.distinct().limit(self.max_candidates + 1)]
+        if len(obj_ids) > self.max_candidates:
+            return None
+        return or_(self.model.id.in_(obj_ids), self.model.id > indexed_up_to)
@@ -1,9 +1,12 @@
 import logging
-import requests
-from actions.settings import USERS_HOST
+from actions.settings import USER_INFO_CACHE_TTL_SECONDS, USER_INFO_CACHE_MAX_SIZE
+from actions.tools.cache import TTLCache
+from actions.tools.http_client import users_client
 
 logger = logging.getLogger('default')
 
+user_info_cache = TTLCache(name='user_info', ttl=USER_INFO_CACHE_TTL_SECONDS, max_size=USER_INFO_CACHE_MAX_SIZE)
+
 
 def create_initials(user_info):
     if user_info['first_name'] and user_info['second_name']:
@@ -17,10 +20,10 @@ def create_initials(user_info):
         return username
 
 
-def get_user_info(username):
-    user_info = requests.get(
-        f'http://{USERS_HOST}/api/v1/users/user-info/{username}'
-    ).json()
+def request_user_info(path):
+    req = users_client.get(path)
+    req.raise_for_status()
+    user_info = req.json()
 
     action_by = {
         'id': user_info['user_id'],
@@ -32,16 +35,19 @@ def get_user_info(username):
     return action_by
 
 
-def get_user_info_by_id(user_id):
-    user_info = requests.get(
-        f'http://{USERS_HOST}/api/v1/users/user-info-by-id/{user_id}'
-    ).json()
+def get_user_info(username):
+    action_by = user_info_cache.get_or_load(
+        ('username', username),
+        lambda: request_user_info(f'/api/v1/users/user-info/{username}')
+    )
 
-    action_by = {
-        'id': user_info['user_id'],
-        'full_name': f"{user_info['first_name']} {user_info['second_name']}",
-        'username': user_info['username'],
-        'initials': create_initials(user_info)
-    }
+    return dict(action_by)
 
-    return action_by
+
+def get_user_info_by_id(user_id):
+    action_by = user_info_cache.get_or_load(
+        ('user_id', user_id),
+        lambda: request_user_info(f'/api/v1/users/user-info-by-id/{user_id}')
+    )
+
+    return dict(action_by)
@@ -1,15 +1,36 @@
+import json
 import os
 
 # LOGGING
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'harp-actions')
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOKI_ENABLED = os.getenv('LOKI_ENABLED', 'true').lower() == 'true'
 LOKI_SERVER = os.getenv('LOKI_SERVER', 'loki-dev.harpia.io')
 LOKI_PORT = os.getenv('LOKI_PORT', 80)
+# Records are shipped by background threads in batches, records above the queue size are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 500))
+LOG_FLUSH_SECONDS = float(os.getenv('LOG_FLUSH_SECONDS', 1))
+# Per message type (event passed with extra or call site) limits below WARNING, 0 disables rate limiting
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv('LOG_RATE_LIMIT_PER_SECOND', 20))
+LOG_RATE_LIMIT_BURST = float(os.getenv('LOG_RATE_LIMIT_BURST', 200))
+# JSON with share of kept records per event below WARNING, e.g. {"action_request": 0.1}
+LOG_SAMPLE_RATES = json.loads(os.getenv('LOG_SAMPLE_RATES', '{}'))
 # Flask settings
 FLASK_SERVER_PORT = os.getenv('FLASK_SERVER_PORT', 8081)
 FLASK_SERVER_NAME = os.getenv('FLASK_SERVER_NAME', '0.0.0.0')
 FLASK_DEBUG = os.getenv('FLASK_DEBUG', True)
 FLASK_THREADED = os.getenv('FLASK_THREADED', True)
+
+# Gunicorn, see actions/gunicorn_conf.py
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 2))
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 8))
+GUNICORN_KEEPALIVE_SECONDS = int(os.getenv('GUNICORN_KEEPALIVE_SECONDS', 5))
+GUNICORN_TIMEOUT_SECONDS = int(os.getenv('GUNICORN_TIMEOUT_SECONDS', 120))
+GUNICORN_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT_SECONDS', 30))
+GUNICORN_MAX_REQUESTS = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+GUNICORN_MAX_REQUESTS_JITTER = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+GUNICORN_PRELOAD = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
 URL_PREFIX = os.getenv('URL_PREFIX', '/harp-actions')
 SERVICE_NAMESPACE = os.getenv('SERVICE_NAMESPACE', 'dev')
 SCENARIOS_HOST = os.getenv('SCENARIOS_HOST', 'http://harp-scenarios:8081/harp-scenarios/api/v1/scenarios')
@@ -24,30 +45,126 @@ DBSCHEMA = os.getenv('DBSCHEMA', 'harp_dev')
 # SQLAlchemy settings
 SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://{0}:{1}@{2}:{3}/{4}'.format(DBUSER, DBPASS, DBHOST, DBPORT, DBSCHEMA)
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+# Read replicas for read-only queries, comma separated host or host:port with the same credentials and schema
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+SQLALCHEMY_REPLICA_BINDS = {
+    f"replica_{idx}": 'mysql+pymysql://{0}:{1}@{2}/{3}'.format(DBUSER, DBPASS, host if ':' in host else f"{host}:{DBPORT}", DBSCHEMA)
+    for idx, host in enumerate(DB_REPLICA_HOSTS)
+}
+# Reads of a client go to the primary for this time after it changed something, covers replication lag.
+# The deadline is kept in a cookie of the client, so it holds on every worker.
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+# Connection pool per process, every gunicorn thread can hold one connection
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 300))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# Isolation level of transactions started by fresh reads (fresh_query), other transactions keep the server default
+DB_FRESH_READS_ISOLATION_LEVEL = os.getenv('DB_FRESH_READS_ISOLATION_LEVEL', 'READ COMMITTED')
+# Statements above the threshold are kept in a per-process ring buffer, see /api/v1/admin/slow-queries
+DB_SLOW_QUERY_SECONDS = float(os.getenv('DB_SLOW_QUERY_SECONDS', 0.5))
+DB_SLOW_QUERY_LOG_SIZE = int(os.getenv('DB_SLOW_QUERY_LOG_SIZE', 200))
+DB_SLOW_QUERY_MAX_PARAMETERS_LENGTH = int(os.getenv('DB_SLOW_QUERY_MAX_PARAMETERS_LENGTH', 2000))
+# Runs EXPLAIN for slow SELECT statements on the same connection right after them
+DB_SLOW_QUERY_EXPLAIN = os.getenv('DB_SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
 TOKEN_EXPIRE_HOURS = 148
 
 ENVIRONMENTS_HOST = os.getenv('ENVIRONMENTS_HOST', 'dev.harpia.io/harp-environments')
 BRIDGE_HOST = os.getenv('BRIDGE_HOST', 'dev.harpia.io/harp-bridge')
 USERS_HOST = os.getenv('USERS_HOST', 'dev.harpia.io/harp-users')
 
+# Outbound HTTP clients
+HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', 10))
+# Retries of idempotent requests, POST is retried only by callers which pass retries
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+HTTP_BACKOFF_SECONDS = float(os.getenv('HTTP_BACKOFF_SECONDS', 0.2))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))
+HTTP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('HTTP_CIRCUIT_FAILURE_THRESHOLD', 5))
+HTTP_CIRCUIT_RESET_SECONDS = float(os.getenv('HTTP_CIRCUIT_RESET_SECONDS', 30))
+
+# User info cache
+USER_INFO_CACHE_TTL_SECONDS = float(os.getenv('USER_INFO_CACHE_TTL_SECONDS', 300))
+USER_INFO_CACHE_MAX_SIZE = int(os.getenv('USER_INFO_CACHE_MAX_SIZE', 1000))
+
+# Scenarios cache
+SCENARIOS_CACHE_TTL_SECONDS = float(os.getenv('SCENARIOS_CACHE_TTL_SECONDS', 60))
+SCENARIOS_CACHE_MAX_SIZE = int(os.getenv('SCENARIOS_CACHE_MAX_SIZE', 5000))
+# Concurrent requests for scenarios missing in the cache when a view needs many of them
+SCENARIOS_FETCH_WORKERS = int(os.getenv('SCENARIOS_FETCH_WORKERS', 8))
+
+# Notification details cache, alerts are also updated by other services so entries must expire quickly
+NOTIFICATION_DETAILS_CACHE_TTL_SECONDS = float(os.getenv('NOTIFICATION_DETAILS_CACHE_TTL_SECONDS', 30))
+NOTIFICATION_DETAILS_CACHE_MAX_SIZE = int(os.getenv('NOTIFICATION_DETAILS_CACHE_MAX_SIZE', 5000))
+# Lifetime of in-process copies, actions made on another worker become visible within it.
+# Without a shared backend this is the whole lifetime of an entry.
+NOTIFICATION_DETAILS_CACHE_LOCAL_TTL_SECONDS = float(os.getenv('NOTIFICATION_DETAILS_CACHE_LOCAL_TTL_SECONDS', 2))
+# Redis shared by all workers for caches which invalidate on writes, e.g. redis://redis:6379/0, needs the redis package.
+# Empty - caches are per process, an invalidation reaches other workers only when their local entries expire.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv('CACHE_REDIS_TIMEOUT_SECONDS', 0.5))
+
+# In-memory index of active notifications by source and object
+ACTIVE_NOTIFICATIONS_INDEX_ENABLED = os.getenv('ACTIVE_NOTIFICATIONS_INDEX_ENABLED', 'true').lower() == 'true'
+ACTIVE_NOTIFICATIONS_REFRESH_SECONDS = float(os.getenv('ACTIVE_NOTIFICATIONS_REFRESH_SECONDS', 5))
+ACTIVE_NOTIFICATIONS_REBUILD_SECONDS = float(os.getenv('ACTIVE_NOTIFICATIONS_REBUILD_SECONDS', 600))
+
+# Force update dispatcher
+FORCE_UPDATE_COALESCE_SECONDS = float(os.getenv('FORCE_UPDATE_COALESCE_SECONDS', 0.5))
+FORCE_UPDATE_RETRIES = int(os.getenv('FORCE_UPDATE_RETRIES', 3))
+FORCE_UPDATE_BACKOFF_SECONDS = float(os.getenv('FORCE_UPDATE_BACKOFF_SECONDS', 1))
+# Alert ids waiting to be sent, later ids are dropped while the bridge is slow
+FORCE_UPDATE_QUEUE_SIZE = int(os.getenv('FORCE_UPDATE_QUEUE_SIZE', 10000))
+
 AUTO_USERS = []
 
 TIME_LIMIT_ALERTS_HISTORY_DAYS = 120
+HISTORY_EVENTS_WITHOUT_COMMENTS_LIMIT = 15
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 100))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 1000))
+HISTORY_EXPORT_BATCH_SIZE = int(os.getenv('HISTORY_EXPORT_BATCH_SIZE', 1000))
+# 'trigram' - pattern search is narrowed down by the trigram table of migration 2, 'like' - plain LIKE scan
+HISTORY_SEARCH_MODE = os.getenv('HISTORY_SEARCH_MODE', 'trigram')
+HISTORY_SEARCH_INDEX_SYNC_SECONDS = float(os.getenv('HISTORY_SEARCH_INDEX_SYNC_SECONDS', 5))
+HISTORY_SEARCH_INDEX_BATCH_SIZE = int(os.getenv('HISTORY_SEARCH_INDEX_BATCH_SIZE', 5000))
+# Newest notifications are searched with LIKE only, must cover ids of inserts still in flight while the sync runs
+HISTORY_SEARCH_INDEX_LOOKBACK_IDS = int(os.getenv('HISTORY_SEARCH_INDEX_LOOKBACK_IDS', 10000))
+HISTORY_SEARCH_MAX_TRIGRAMS = int(os.getenv('HISTORY_SEARCH_MAX_TRIGRAMS', 4))
+# Patterns found in more notifications are searched with LIKE only, the index doesn't narrow them down
+HISTORY_SEARCH_MAX_CANDIDATES = int(os.getenv('HISTORY_SEARCH_MAX_CANDIDATES', 20000))
 
 
-JIRA_SERVER = 'https://jira.com'
-JIRA_USER = 'user'
-JIRA_PASSWORD = 'password'
-JIRA_TIMEOUT = 60
+JIRA_SERVER = os.getenv('JIRA_SERVER', 'https://jira.com')
+JIRA_USER = os.getenv('JIRA_USER', 'user')
+JIRA_PASSWORD = os.getenv('JIRA_PASSWORD', 'password')
+JIRA_TIMEOUT = int(os.getenv('JIRA_TIMEOUT', 60))
+# Empty - connect directly, proxy variables of the environment are ignored
+JIRA_PROXY = os.getenv('JIRA_PROXY', '')
+JIRA_POOL_SIZE = int(os.getenv('JIRA_POOL_SIZE', 4))
 JIRA_WATCHERS = ['some_user']
 JIRA_TODO_ISSUE_ID = '391'
 JIRA_ONGOING_TASK_COMPONENT_ID = '25602'
 JIRA_STUDIO_SUPPORT_COMPONENT_ID = '28401'
 JIRA_EPIC = 'JIRA_EPIC'
+# Review statuses of procedures are reconciled with Jira in the background
+JIRA_RECONCILE_SECONDS = float(os.getenv('JIRA_RECONCILE_SECONDS', 300))
+JIRA_RECONCILE_BATCH_SIZE = int(os.getenv('JIRA_RECONCILE_BATCH_SIZE', 100))
+
+# Action metrics, label values above the limit are counted as 'other'
+ACTION_METRICS_MAX_STUDIOS = int(os.getenv('ACTION_METRICS_MAX_STUDIOS', 50))
+# Comma separated users counted as 'system', e.g. automation accounts
+ACTION_METRICS_SYSTEM_USERS = [user for user in os.getenv('ACTION_METRICS_SYSTEM_USERS', 'me_auto').split(',') if user]
+# Amount of the most acted on alerts exported with alert_id label, 0 - disabled
+ACTION_METRICS_TOP_K = int(os.getenv('ACTION_METRICS_TOP_K', 0))
 
 # Auth
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'khFw8H5hP3gQ9kKS')
 JWT_DECODE_ALGORITHMS = os.getenv('JWT_DECODE_ALGORITHMS', ['RS256'])
 JWT_IDENTITY_CLAIM = os.getenv('JWT_IDENTITY_CLAIM', 'sub')
 JWT_USER_CLAIMS = os.getenv('JWT_USER_CLAIMS', 'authorities')
+# Comma separated users allowed to use admin endpoints, empty - admin endpoints are denied to everyone
+ADMIN_USERS = [user for user in os.getenv('ADMIN_USERS', '').split(',') if user]
+# Verified token claims are cached by token hash, never longer than the token exp
+AUTH_TOKEN_CACHE_TTL_SECONDS = float(os.getenv('AUTH_TOKEN_CACHE_TTL_SECONDS', 300))
+AUTH_TOKEN_CACHE_MAX_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_MAX_SIZE', 10000))
 PROPAGATE_EXCEPTIONS = os.getenv('PROPAGATE_EXCEPTIONS', True)
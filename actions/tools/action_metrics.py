@@ -0,0 +1,129 @@
+import threading
+import time
+from functools import wraps
+from prometheus_client.core import GaugeMetricFamily
+import actions.settings as settings
+from actions.tools.prometheus_metrics import Prom
+
+OTHER = 'other'
+
+
+class BoundedLabel(object):
+    """
+    Keeps the first max_values distinct values of a label, all later values are reported as 'other'
+    """
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._values = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        value = str(value)
+        if value in self._values:
+            return value
+        with self._lock:
+            if len(self._values) < self.max_values:
+                self._values.add(value)
+                return value
+        return OTHER
+
+
+class TopKTracker(object):
+    """
+    Approximate counts of the k most frequent keys (Space-Saving). A new key replaces the least counted one
+    and inherits its count, so the reported count of a key is an upper bound and memory never exceeds k keys.
+    """
+    def __init__(self, k: int):
+        self.k = k
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, amount=1):
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += amount
+            elif len(self._counts) < self.k:
+                self._counts[key] = amount
+            else:
+                coldest = min(self._counts, key=self._counts.get)
+                self._counts[key] = self._counts.pop(coldest) + amount
+
+    def top(self):
+        with self._lock:
+            return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class HotAlertsCollector(object):
+    """
+    Exports the tracked alerts on every scrape, evicted alerts disappear from the output.
+    With gunicorn every worker tracks its own actions, a scrape shows the worker which served it.
+    """
+    def __init__(self, tracker: TopKTracker):
+        self.tracker = tracker
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            'hot_alert_actions', 'Estimated amount of actions on the most acted on alerts', labels=['alert_id']
+        )
+        for alert_id, count in self.tracker.top():
+            family.add_metric([str(alert_id)], count)
+        yield family
+
+
+class ActionMetrics(object):
+    """
+    Action counters with bounded label sets: action, studio and user class instead of alert id and user name
+    """
+    def __init__(self, max_studios: int, system_users: list, top_k: int):
+        self.studio_label = BoundedLabel(max_studios)
+        self.system_users = set(system_users)
+        self.hot_alerts = TopKTracker(top_k) if top_k else None
+        self._registries = set()
+
+    def user_class(self, username):
+        return 'system' if username in self.system_users else 'user'
+
+    def record(self, action: str, username: str, studios: dict):
+        """
+        Counts an action over alerts, studios are studio ids by alert id
+        """
+        user_class = self.user_class(username)
+        per_studio = {}
+        for studio in studios.values():
+            studio = self.studio_label(studio)
+            per_studio[studio] = per_studio.get(studio, 0) + 1
+        for studio, amount in per_studio.items():
+            Prom.actions.labels(action=action, studio=studio, user_class=user_class).inc(amount)
+        if self.hot_alerts is not None:
+            for alert_id in studios:
+                self.hot_alerts.add(alert_id)
+
+    def timed(self, action: str):
+        """
+        Observes latency of the decorated request handler
+        """
+        def wrapper(fn):
+            @wraps(fn)
+            def decorator(*args, **kwargs):
+                start_ts = time.time()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    Prom.action_duration.labels(action=action).observe(time.time() - start_ts)
+            return decorator
+        return wrapper
+
+    def register(self, registry):
+        if self.hot_alerts is not None and id(registry) not in self._registries:
+            registry.register(HotAlertsCollector(self.hot_alerts))
+            self._registries.add(id(registry))
+
+
+action_metrics = ActionMetrics(
+    max_studios=settings.ACTION_METRICS_MAX_STUDIOS,
+    system_users=settings.ACTION_METRICS_SYSTEM_USERS,
+    top_k=settings.ACTION_METRICS_TOP_K
+)
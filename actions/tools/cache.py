@@ -0,0 +1,220 @@
+import abc
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from actions.tools.prometheus_metrics import Prom
+import actions.settings as settings
+
+logger = logging.getLogger('default')
+
+
+class CacheBackend(abc.ABC):
+    """
+    Shared cache backend (e.g. Redis or Memcached) behind TTLCache.
+    Keys and values are strings, values are JSON encoded by TTLCache.
+    """
+    @abc.abstractmethod
+    def get(self, key: str):
+        """
+        Value of the key, None if it is missing or expired
+        """
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str, ttl: float):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-memory stand-in for a shared backend, for local runs and benchmarks
+    """
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            return None
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis shared by all workers, the redis package is imported only when the backend is configured.
+    The client reconnects in forked processes.
+    """
+    def __init__(self, url: str, timeout: float):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def shared_backend():
+    """
+    Backend configured with CACHE_REDIS_URL, None if caches are per process
+    """
+    if not settings.CACHE_REDIS_URL:
+        return None
+    return RedisBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_TIMEOUT_SECONDS)
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache(object):
+    """
+    Thread-safe in-process cache with TTL and size-bounded LRU eviction.
+    Concurrent loads of the same key are collapsed into one loader call (single-flight),
+    expired entries are kept until evicted and served if the loader fails.
+    Without a backend invalidate drops the entry of this process only, other processes keep serving
+    their copies until local_ttl expires. With a shared backend invalidate also deletes the shared entry,
+    a local miss is looked up in the backend before calling the loader, and local copies on other processes
+    are still served for up to local_ttl.
+    A value loaded while the key was invalidated is returned to the waiting callers but not cached.
+    """
+    def __init__(self, name: str, ttl: float, max_size: int, backend: CacheBackend = None, local_ttl: float = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self.local_ttl = ttl if local_ttl is None else min(local_ttl, ttl)
+        self._data = OrderedDict()
+        self._in_flight = {}
+        # Invalidations per key, kept only while the key is being loaded
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _count(self, result):
+        Prom.cache_requests.labels(cache=self.name, result=result).inc(1)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] > time.time():
+                self._data.move_to_end(key)
+                self._count('hit')
+                return entry[0]
+        self._count('miss')
+        return self._get_shared(key) if self.backend else None
+
+    def _backend_key(self, key):
+        return f"{self.name}:{key}"
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.local_ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _get_shared(self, key):
+        try:
+            value = self.backend.get(self._backend_key(key))
+        except Exception as err:
+            logger.warning(msg=f"Cache backend of {self.name} is not available: {err}")
+            return None
+        if value is None:
+            return None
+        self._count('shared_hit')
+        value = json.loads(value)
+        self._set_local(key, value)
+        return value
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self.backend:
+            try:
+                self.backend.set(self._backend_key(key), json.dumps(value), self.ttl)
+            except Exception as err:
+                logger.warning(msg=f"Cache backend of {self.name} is not available: {err}")
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            if key in self._in_flight:
+                self._generations[key] = self._generations.get(key, 0) + 1
+        if self.backend:
+            try:
+                self.backend.delete(self._backend_key(key))
+            except Exception as err:
+                logger.warning(msg=f"Cache backend of {self.name} is not available: {err}")
+
+    def clear(self):
+        """
+        Drops local entries only
+        """
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] > time.time():
+                self._data.move_to_end(key)
+                self._count('hit')
+                return entry[0]
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                generation = self._generations.get(key, 0)
+        self._count('miss')
+
+        if not leader:
+            flight.event.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._get_shared(key) if self.backend else None
+            if flight.value is None:
+                flight.value = loader()
+                with self._lock:
+                    invalidated = self._generations.get(key, 0) != generation
+                if not invalidated:
+                    self.set(key, flight.value)
+        except Exception as err:
+            if entry is None:
+                flight.error = err
+                raise
+            self._count('stale')
+            flight.value = entry[0]
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                self._generations.pop(key, None)
+            flight.event.set()
+        return flight.value
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from actions.tools.prometheus_metrics import Prom
+import actions.settings as settings
+
+# Statements are attributed to the first caller frame from these modules
+MODEL_MODULES = (os.path.join('actions', 'logic', 'db.py'),)
+APP_PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_PACKAGE = os.path.join(APP_PACKAGE, 'tools')
+
+
+class SlowQueryLog(object):
+    """
+    Ring buffer of the latest slow statements of this process
+    """
+    def __init__(self, size: int):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self, limit: int = None, min_duration: float = 0):
+        with self._lock:
+            entries = [entry for entry in reversed(self._entries) if entry['duration'] >= min_duration]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryLog(settings.DB_SLOW_QUERY_LOG_SIZE)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    qualname = getattr(code, 'co_qualname', None)
+    if qualname:
+        return qualname
+    owner = frame.f_locals.get('cls')
+    if owner is None and 'self' in frame.f_locals:
+        owner = type(frame.f_locals['self'])
+    return f"{owner.__name__}.{code.co_name}" if owner else code.co_name
+
+
+def calling_method():
+    """
+    Model method which issued the statement, or the first application frame for queries made elsewhere
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.endswith(MODEL_MODULES):
+            return _frame_name(frame)
+        if fallback is None and filename.startswith(APP_PACKAGE) and not filename.startswith(TOOLS_PACKAGE):
+            fallback = frame
+        frame = frame.f_back
+    return _frame_name(fallback) if fallback is not None else 'other'
+
+
+def current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return 'background'
+
+
+def _explain(cursor, statement, parameters, context):
+    # Plain DB-API cursor of the same connection, it is not seen by engine events.
+    # Streamed results are still being read from the connection, they can't be explained.
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    if context is not None and context.execution_options.get('stream_results'):
+        return None
+    try:
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(f"EXPLAIN {statement}", parameters)
+            columns = [column[0] for column in explain_cursor.description]
+            return [
+                {column: value if value is None or isinstance(value, (int, float)) else str(value)
+                 for column, value in zip(columns, row)}
+                for row in explain_cursor.fetchall()
+            ]
+        finally:
+            explain_cursor.close()
+    except Exception as err:
+        return f"Can't explain the statement: {err}"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_ts', []).append(time.time())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_stack = conn.info.get('query_start_ts')
+    if not start_stack:
+        return
+    duration = time.time() - start_stack.pop()
+    method = calling_method()
+    route = current_route()
+    Prom.db_queries.labels(method=method, route=route).inc(1)
+    Prom.db_query_duration.labels(method=method).observe(duration)
+
+    if duration >= settings.DB_SLOW_QUERY_SECONDS:
+        slow_queries.add({
+            'ts': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+            'duration': round(duration, 6),
+            'method': method,
+            'route': route,
+            'statement': statement,
+            'parameters': repr(parameters)[:settings.DB_SLOW_QUERY_MAX_PARAMETERS_LENGTH],
+            'explain': _explain(cursor, statement, parameters, context) if settings.DB_SLOW_QUERY_EXPLAIN else None
+        })
+
+
+def handle_error(exception_context):
+    # Failed statements don't reach after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start_ts'):
+        connection.info['query_start_ts'].pop()
+
+
+def instrument_engines():
+    """
+    Times statements of all engines, including the replica binds
+    """
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(Engine, 'handle_error', handle_error)
@@ -0,0 +1,56 @@
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from actions.tools.prometheus_metrics import Prom
+import actions.settings as settings
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool which exports connection usage and checkout wait time to Prometheus.
+    Metrics are labeled by the bind of the engine, see label_pool.
+    """
+    label = 'primary'
+
+    def _report(self):
+        Prom.db_pool_checked_out.labels(pool=self.label).set(self.checkedout())
+        Prom.db_pool_overflow.labels(pool=self.label).set(max(self.overflow(), 0))
+
+    def _do_get(self):
+        start_ts = time.time()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            Prom.db_pool_timeouts.labels(pool=self.label).inc(1)
+            raise
+        finally:
+            Prom.db_pool_wait.labels(pool=self.label).observe(time.time() - start_ts)
+        self._report()
+        return connection
+
+    def _do_return_conn(self, connection):
+        super()._do_return_conn(connection)
+        self._report()
+
+    def recreate(self):
+        # Engine dispose replaces the pool, the new one keeps the label
+        pool = super().recreate()
+        label_pool(pool, self.label)
+        return pool
+
+
+def label_pool(pool, label: str):
+    if isinstance(pool, InstrumentedQueuePool) and pool.__dict__.get('label') != label:
+        pool.label = label
+        Prom.db_pool_size.labels(pool=label).set(pool.size())
+
+
+def engine_options():
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT_SECONDS,
+        'pool_recycle': settings.DB_POOL_RECYCLE_SECONDS,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING
+    }
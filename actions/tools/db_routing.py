@@ -0,0 +1,140 @@
+import inspect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import has_request_context, request, g
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+import actions.settings as settings
+from actions.tools.db_pool import label_pool
+
+_routing = threading.local()
+
+# Clients which made changes recently get the deadline of their primary reads in this cookie,
+# so stickiness holds whichever worker serves the next request
+STICKY_COOKIE = 'harp_actions_primary_until'
+
+
+def _mode():
+    return getattr(_routing, 'mode', None)
+
+
+@contextmanager
+def _use(mode):
+    previous = _mode()
+    # Primary wins over nested replica reads
+    _routing.mode = previous if previous == 'primary' else mode
+    try:
+        yield
+    finally:
+        _routing.mode = previous
+
+
+def replica_reads():
+    return _use('replica')
+
+
+def primary_reads():
+    """
+    Forces primary for the block, e.g. for results which are cached after reading
+    """
+    return _use('primary')
+
+
+def read_only(fn):
+    """
+    Marks a model method as read-only, its queries can be served by a replica
+    """
+    if inspect.isgeneratorfunction(fn):
+        @wraps(fn)
+        def generator(*args, **kwargs):
+            with replica_reads():
+                yield from fn(*args, **kwargs)
+        return generator
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def mark_written():
+    """
+    Sends reads of the current client to the primary for DB_REPLICA_STICKY_SECONDS
+    """
+    if has_request_context():
+        g.primary_until = time.time() + settings.DB_REPLICA_STICKY_SECONDS
+
+
+def _is_sticky():
+    if not has_request_context():
+        return False
+    if g.get('primary_until'):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _set_sticky_cookie(response):
+    primary_until = g.get('primary_until')
+    if primary_until:
+        response.set_cookie(
+            STICKY_COOKIE, str(primary_until), max_age=int(settings.DB_REPLICA_STICKY_SECONDS) + 1,
+            httponly=True, samesite='Lax'
+        )
+    return response
+
+
+class RoutingSession(SignallingSession):
+    """
+    Sends queries of read-only methods to a replica, chosen once per session so a request reads
+    from a single replica. Flushes, sessions which have written and clients which have written
+    recently use the primary.
+    """
+    def get_bind(self, mapper=None, clause=None):
+        if settings.SQLALCHEMY_REPLICA_BINDS and _mode() == 'replica' and not self._flushing \
+                and not self.info.get('written') and not _is_sticky():
+            if 'replica' not in self.info:
+                self.info['replica'] = random.choice(list(settings.SQLALCHEMY_REPLICA_BINDS))
+            return self.db.get_engine(self.app, bind=self.info['replica'])
+        return super().get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    session.info['written'] = True
+
+
+@event.listens_for(RoutingSession, 'after_bulk_update')
+def _after_bulk_update(update_context):
+    update_context.session.info['written'] = True
+
+
+@event.listens_for(RoutingSession, 'after_bulk_delete')
+def _after_bulk_delete(delete_context):
+    delete_context.session.info['written'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    if session.info.get('written'):
+        mark_written()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def init_app(self, app):
+        super().init_app(app)
+        app.after_request(_set_sticky_cookie)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def get_engine(self, app=None, bind=None):
+        engine = super().get_engine(app, bind)
+        label_pool(engine.pool, bind or 'primary')
+        return engine
@@ -0,0 +1,136 @@
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import actions.settings as settings
+from actions.tools.prometheus_metrics import Prom
+
+logger = logging.getLogger('default')
+
+# Safe to repeat after a timeout or 5xx, other methods are retried only if the caller passes retries
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Opens after failure_threshold consecutive failures and lets a single trial request through
+    once reset_seconds have passed.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_ts = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_ts is None:
+                return True
+            if time.time() - self.opened_ts >= self.reset_seconds:
+                # Half-open: postpone other requests until the trial one finishes
+                self.opened_ts = time.time()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_ts = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_ts = time.time()
+
+
+class ServiceClient(object):
+    """
+    HTTP client for a single upstream service with keep-alive connection pool,
+    default timeout, retries with exponential backoff, circuit breaker and latency metrics.
+    """
+    def __init__(self, upstream: str, base_url: str, timeout=settings.HTTP_TIMEOUT_SECONDS,
+                 retries=settings.HTTP_RETRIES, backoff_seconds=settings.HTTP_BACKOFF_SECONDS):
+        self.upstream = upstream
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.HTTP_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.HTTP_CIRCUIT_RESET_SECONDS
+        )
+        self.session = self._new_session()
+
+    @staticmethod
+    def _new_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_MAXSIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def reset(self):
+        """
+        Drops pooled connections, used in forked worker processes which must not share sockets with the parent
+        """
+        self.session = self._new_session()
+
+    def request(self, method: str, path: str, retries=None, backoff_seconds=None, **kwargs):
+        if retries is None:
+            retries = self.retries if method.upper() in IDEMPOTENT_METHODS else 0
+        backoff_seconds = self.backoff_seconds if backoff_seconds is None else backoff_seconds
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(retries + 1):
+            if not self.circuit_breaker.allow():
+                Prom.upstream_requests.labels(upstream=self.upstream, result='circuit_open').inc(1)
+                raise CircuitOpenError(f"Circuit breaker is open for {self.upstream}")
+
+            start_ts = time.time()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                self._observe(method, start_ts, 'error')
+                self.circuit_breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                logger.warning(msg=f"Request to {self.upstream} failed: {method} {url}. Attempt: {attempt + 1}\nError: {err}")
+            else:
+                self._observe(method, start_ts, str(response.status_code))
+                if response.status_code < 500:
+                    self.circuit_breaker.record_success()
+                    return response
+                self.circuit_breaker.record_failure()
+                if attempt >= retries:
+                    return response
+                logger.warning(msg=f"Request to {self.upstream} failed: {method} {url}. Attempt: {attempt + 1}\nStatus code: {response.status_code}")
+            time.sleep(backoff_seconds * 2 ** attempt)
+
+    def _observe(self, method, start_ts, result):
+        Prom.upstream_request_duration.labels(upstream=self.upstream, method=method).observe(time.time() - start_ts)
+        Prom.upstream_requests.labels(upstream=self.upstream, result=result).inc(1)
+
+    def get(self, path: str, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+environments_client = ServiceClient('harp-environments', f"http://{settings.ENVIRONMENTS_HOST}")
+bridge_client = ServiceClient('harp-bridge', f"http://{settings.BRIDGE_HOST}")
+users_client = ServiceClient('harp-users', f"http://{settings.USERS_HOST}")
+scenarios_client = ServiceClient('harp-scenarios', settings.SCENARIOS_HOST)
+
+
+def reset_clients():
+    for client in [environments_client, bridge_client, users_client, scenarios_client]:
+        client.reset()
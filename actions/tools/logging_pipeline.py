@@ -0,0 +1,214 @@
+import abc
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import requests
+import actions.settings as settings
+from actions.tools.prometheus_metrics import Prom
+
+# Attributes of every LogRecord, everything else was passed with extra and is shipped as a field
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    One JSON object per line: level, event, message and fields passed with extra
+    """
+    def format(self, record):
+        line = {
+            'level': record.levelname,
+            'event': getattr(record, 'event', None) or f"{record.module}:{record.lineno}",
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and key != 'event':
+                line[key] = value
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per message type sampling and rate limiting, runs before any formatting.
+    The type is the event passed with extra or the call site. Records of WARNING and above always pass.
+    """
+    def __init__(self, sample_rates: dict, rate_per_second: float, burst: float):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _allow(self, message_type):
+        now = time.time()
+        with self._lock:
+            tokens, updated_ts = self._buckets.get(message_type, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_ts) * self.rate_per_second)
+            allowed = tokens >= 1
+            self._buckets[message_type] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        message_type = getattr(record, 'event', None) or f"{record.module}:{record.lineno}"
+        sample_rate = self.sample_rates.get(message_type, 1)
+        if sample_rate < 1 and random.random() >= sample_rate:
+            Prom.log_records_dropped.labels(reason='sampled').inc(1)
+            return False
+        if self.rate_per_second and not self._allow(message_type):
+            Prom.log_records_dropped.labels(reason='rate_limited').inc(1)
+            return False
+        return True
+
+
+class BatchingHandler(logging.Handler, abc.ABC):
+    """
+    Puts records to a bounded queue, a background thread formats and ships them in batches
+    of batch_size or every flush_seconds. Records which don't fit into the queue are dropped and counted.
+    Subclasses implement ship.
+    """
+    def __init__(self, name: str, queue_size: int, batch_size: int, flush_seconds: float):
+        super().__init__()
+        self.name = name
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _ensure_worker(self):
+        # The worker is started lazily and restarted in forked processes
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._pid = os.getpid()
+                self.on_start()
+                self._thread = threading.Thread(target=self._run, name=f"log-{self.name}", daemon=True)
+                self._thread.start()
+
+    def emit(self, record):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            Prom.log_records_dropped.labels(reason=f"{self.name}_queue_full").inc(1)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            self._ship_safely(batch)
+
+    def _ship_safely(self, batch):
+        try:
+            self.ship(batch)
+        except Exception as err:
+            Prom.log_records_dropped.labels(reason=f"{self.name}_failed").inc(len(batch))
+            sys.stderr.write(f"Can't ship {len(batch)} log records to {self.name}: {err}\n")
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._ship_safely(batch)
+
+    def on_start(self):
+        pass
+
+    @abc.abstractmethod
+    def ship(self, records: list):
+        """
+        Formats and sends a batch of records, runs on the worker thread
+        """
+
+
+class ConsoleShipper(BatchingHandler):
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(name='console', **kwargs)
+        self.stream = stream or sys.stderr
+
+    def ship(self, records: list):
+        self.stream.write(''.join([self.format(record) + '\n' for record in records]))
+        self.stream.flush()
+
+
+class LokiShipper(BatchingHandler):
+    """
+    Pushes batches to Loki, one stream per level. A plain session is used, failures of log shipping
+    must not be logged again.
+    """
+    def __init__(self, url: str, tags: dict, timeout: float = 10, **kwargs):
+        super().__init__(name='loki', **kwargs)
+        self.url = url
+        self.tags = tags
+        self.timeout = timeout
+        self.session = None
+
+    def on_start(self):
+        self.session = requests.Session()
+
+    def ship(self, records: list):
+        streams = {}
+        for record in records:
+            streams.setdefault(record.levelname.lower(), []).append(
+                [str(int(record.created * 1e9)), self.format(record)]
+            )
+        body = {'streams': [
+            {'stream': dict(self.tags, severity=level), 'values': values} for level, values in streams.items()
+        ]}
+        response = self.session.post(self.url, json=body, timeout=self.timeout)
+        response.raise_for_status()
+
+
+def configure_logging(logger):
+    logger.setLevel(settings.LOG_LEVEL)
+    logger.propagate = False
+    logger.addFilter(SamplingFilter(
+        sample_rates=settings.LOG_SAMPLE_RATES,
+        rate_per_second=settings.LOG_RATE_LIMIT_PER_SECOND,
+        burst=settings.LOG_RATE_LIMIT_BURST
+    ))
+    formatter = StructuredFormatter()
+    shippers = [ConsoleShipper(
+        queue_size=settings.LOG_QUEUE_SIZE, batch_size=settings.LOG_BATCH_SIZE, flush_seconds=settings.LOG_FLUSH_SECONDS
+    )]
+    if settings.LOKI_ENABLED:
+        shippers.append(LokiShipper(
+            url=f"http://{settings.LOKI_SERVER}:{settings.LOKI_PORT}/loki/api/v1/push",
+            tags={"service": settings.SERVICE_NAME, "namespace": settings.SERVICE_NAMESPACE},
+            queue_size=settings.LOG_QUEUE_SIZE, batch_size=settings.LOG_BATCH_SIZE, flush_seconds=settings.LOG_FLUSH_SECONDS
+        ))
+    for shipper in shippers:
+        shipper.setFormatter(formatter)
+        logger.addHandler(shipper)
+    return logger
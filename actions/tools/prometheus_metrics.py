@@ -1,7 +1,44 @@
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge, Histogram
 
 
 class Prom:
-    notification_statistics_by_alert_name = Counter('notification_statistics_by_alert_name', 'Amount of actions', [
-        'alert_id', 'event_name', 'user_name'
+    actions = Counter('actions', 'Amount of alerts operators acted on', [
+        'action', 'studio', 'user_class'
+    ])
+    action_duration = Histogram('action_duration_seconds', 'Latency of action requests', [
+        'action'
+    ])
+    cache_requests = Counter('cache_requests', 'Amount of in-process cache lookups', [
+        'cache', 'result'
+    ])
+    upstream_requests = Counter('upstream_requests', 'Amount of requests to upstream services', [
+        'upstream', 'result'
+    ])
+    upstream_request_duration = Histogram('upstream_request_duration_seconds', 'Latency of requests to upstream services', [
+        'upstream', 'method'
+    ])
+    db_pool_size = Gauge('db_pool_size', 'Configured size of database connection pool', [
+        'pool'
+    ], multiprocess_mode='livesum')
+    db_pool_checked_out = Gauge('db_pool_checked_out', 'Database connections in use', [
+        'pool'
+    ], multiprocess_mode='livesum')
+    db_pool_overflow = Gauge('db_pool_overflow', 'Database connections opened above the pool size', [
+        'pool'
+    ], multiprocess_mode='livesum')
+    db_pool_wait = Histogram('db_pool_wait_seconds', 'Time spent waiting for a database connection from the pool', [
+        'pool'
+    ], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    db_pool_timeouts = Counter('db_pool_timeouts', 'Amount of requests which failed to get a database connection in time', [
+        'pool'
+    ])
+    db_queries = Counter('db_queries', 'Amount of database statements by calling model method and route', [
+        'method', 'route'
+    ])
+    db_query_duration = Histogram('db_query_duration_seconds', 'Latency of database statements by calling model method', [
+        'method'
+    ], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    force_updates_dropped = Counter('force_updates_dropped', 'Amount of alerts dropped from the full force update queue')
+    log_records_dropped = Counter('log_records_dropped', 'Amount of log records dropped before shipping', [
+        'reason'
     ])
@@ -0,0 +1,3 @@
+from actions.app import create_app
+
+application = create_app()
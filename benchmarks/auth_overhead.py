@@ -0,0 +1,71 @@
+"""
+Benchmark of authentication overhead per request with an RS256 token: decoding the token twice per request
+as before, verification with an empty token cache and repeat requests served from the cache.
+
+    python -m benchmarks.auth_overhead --requests 2000
+"""
+import argparse
+import timeit
+from benchmarks.fakes import start_fake_upstreams
+
+start_fake_upstreams()
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token, decode_token  # noqa: E402
+from actions.app import app  # noqa: E402
+from actions.logic.auth_decorator import authenticate, verified_tokens  # noqa: E402
+
+
+def configure_rs256():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    app.config['JWT_ALGORITHM'] = 'RS256'
+    app.config['JWT_DECODE_ALGORITHMS'] = ['RS256']
+    app.config['JWT_PRIVATE_KEY'] = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    app.config['JWT_PUBLIC_KEY'] = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    JWTManager(app)
+
+
+def previous_auth(token):
+    with app.test_request_context(headers={'AuthToken': token}):
+        decode_token(token, allow_expired=False)
+        decode_token(token, allow_expired=False)['sub']
+
+
+def cold_auth(token):
+    verified_tokens.clear()
+    with app.test_request_context(headers={'AuthToken': token}):
+        authenticate(token)
+
+
+def cached_auth(token):
+    with app.test_request_context(headers={'AuthToken': token}):
+        authenticate(token)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    configure_rs256()
+    with app.app_context():
+        token = create_access_token(identity='bench')
+
+    cases = {
+        'decode twice (previous)': previous_auth,
+        'verify once, cold cache': cold_auth,
+        'verify once, cached': cached_auth,
+    }
+    for name, case in cases.items():
+        best = min(timeit.repeat(lambda: case(token), number=args.requests, repeat=args.repeat))
+        print(f"{name:<28} {best / args.requests * 1e6:10.1f} us/request")
+
+
+if __name__ == '__main__':
+    main()
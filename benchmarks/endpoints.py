@@ -0,0 +1,221 @@
+"""
+Benchmark suite for hot endpoints: boots the application against a local database with synthetic data and
+fake upstream services, then measures throughput and p50/p99 latency per endpoint.
+Results are saved as JSON, with --compare the run fails if p99 or throughput regressed beyond --max-regression.
+Needs a MySQL database configured with DBHOST, DBPORT, DBUSER, DBPASS and DBSCHEMA, the data is generated once.
+
+    python -m benchmarks.endpoints --alerts 100000 --requests 500 --concurrency 8 --output results.json
+    python -m benchmarks.endpoints --compare results.json
+"""
+import argparse
+import datetime
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fakes import start_fake_upstreams
+
+start_fake_upstreams()
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from actions.app import app, init_database, prepare_database, initialize_app  # noqa: E402
+from actions.logic.db import NotificationHistory, ActiveAlerts, Statistics, Procedures  # noqa: E402
+from actions.settings import URL_PREFIX  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+ACTION_TS_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+
+
+def populate(args):
+    synthetic.create_schema()
+    synthetic.populate_notifications(args.alerts)
+    synthetic.populate_table(
+        ActiveAlerts, lambda: synthetic.active_alert_rows(args.alerts, args.active_share), ActiveAlerts.alert_id
+    )
+    synthetic.populate_table(Statistics, lambda: synthetic.statistics_rows(args.alerts), Statistics.alert_id)
+    synthetic.populate_table(Procedures, lambda: synthetic.procedure_rows(args.procedures), Procedures.id)
+    synthetic.populate_table(
+        NotificationHistory,
+        lambda: synthetic.notification_history_rows(args.alerts, args.events_per_alert),
+        NotificationHistory.id
+    )
+
+
+def boot(args):
+    init_database()
+    with app.app_context():
+        populate(args)
+        prepare_database()
+    initialize_app()
+    # Tokens of the benchmark are signed with the shared secret instead of the production key pair
+    app.config['JWT_ALGORITHM'] = 'HS256'
+    app.config['JWT_DECODE_ALGORITHMS'] = ['HS256']
+    with app.app_context():
+        return create_access_token(identity='bench')
+
+
+def time_window(days):
+    now = datetime.datetime.utcnow()
+    return (now - datetime.timedelta(days=days)).strftime(DATE_FORMAT), now.strftime(DATE_FORMAT)
+
+
+def cases(args):
+    """
+    Request factories by case name, every call returns (method, path, json body)
+    """
+    rnd = random.Random(args.seed)
+
+    def alert_ids():
+        return rnd.sample(range(1, args.alerts + 1), args.bulk_size)
+
+    def history():
+        date_from, date_to = time_window(7)
+        return 'POST', '/api/v1/history/', {
+            'environment_id': [], 'notification_type': [], 'pattern': '', 'monitoring_system': '', 'service': '',
+            'source': '', 'name': '', 'object': '', 'from': date_from, 'to': date_to, 'scenario_id': '',
+            'page_size': 100
+        }
+
+    def timeline():
+        date_from, date_to = time_window(30)
+        return 'POST', '/api/v1/history/timeline', {'alert_ids': alert_ids(), 'from': date_from, 'to': date_to}
+
+    def notification_details():
+        return 'GET', f"/api/v1/notifications/notification-details/{rnd.randint(1, args.alerts)}", None
+
+    def snooze_until():
+        return (datetime.datetime.utcnow() + datetime.timedelta(hours=1)).strftime(ACTION_TS_FORMAT)
+
+    return {
+        'history': history,
+        'history_timeline': timeline,
+        'notification_details': notification_details,
+        'add_comment': lambda: ('POST', '/api/v1/actions/add-comment', {'alert_ids': alert_ids(), 'comment': 'bench'}),
+        'snooze': lambda: ('POST', '/api/v1/actions/snooze', {
+            'alert_ids': alert_ids(), 'action_ts': snooze_until(), 'comment': 'bench',
+            'sticky_severity': 0, 'sticky_output': 0
+        }),
+        'cancel_snooze': lambda: ('POST', '/api/v1/actions/cancel-snooze', {'alert_ids': alert_ids(), 'comment': 'bench'}),
+        'acknowledge': lambda: ('POST', '/api/v1/actions/acknowledge', {'alert_ids': alert_ids(), 'comment': 'bench'}),
+        'cancel_acknowledge': lambda: ('POST', '/api/v1/actions/cancel-acknowledge', {'alert_ids': alert_ids(), 'comment': 'bench'}),
+    }
+
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(share * len(sorted_values)) - 1))]
+
+
+def run_case(make_request, token, requests_count, concurrency, warmup):
+    local = threading.local()
+    headers = {'AuthToken': token}
+
+    def send(_):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        method, path, body = make_request()
+        start_ts = time.perf_counter()
+        response = local.client.open(URL_PREFIX + path, method=method, json=body, headers=headers)
+        return time.perf_counter() - start_ts, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(warmup)))
+        start_ts = time.perf_counter()
+        results = list(executor.map(send, range(requests_count)))
+        elapsed = time.perf_counter() - start_ts
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'requests': requests_count,
+        'errors': errors,
+        'throughput_rps': round(requests_count / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """
+    Returns names of cases whose p99 grew or throughput dropped by more than max_regression
+    """
+    regressed = []
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        p99_change = current['p99_ms'] / previous['p99_ms'] - 1 if previous['p99_ms'] else 0
+        throughput_change = current['throughput_rps'] / previous['throughput_rps'] - 1 if previous['throughput_rps'] else 0
+        status = 'ok'
+        if p99_change > max_regression or throughput_change < -max_regression:
+            status = 'REGRESSED'
+            regressed.append(name)
+        print(f"{name:<22} p99 {p99_change:+8.1%}  throughput {throughput_change:+8.1%}  {status}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--alerts', type=int, default=100000)
+    parser.add_argument('--active-share', type=float, default=0.2)
+    parser.add_argument('--events-per-alert', type=int, default=20)
+    parser.add_argument('--procedures', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--bulk-size', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cases', nargs='+', help='Subset of cases to run, all by default')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='Results of a previous run to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    token = boot(args)
+    results = {
+        'revision': git_revision(),
+        'started_ts': datetime.datetime.utcnow().strftime(DATE_FORMAT),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'cases': {}
+    }
+    for name, make_request in cases(args).items():
+        if args.cases and name not in args.cases:
+            continue
+        results['cases'][name] = run_case(make_request, token, args.requests, args.concurrency, args.warmup)
+        case = results['cases'][name]
+        print(f"{name:<22} {case['throughput_rps']:9.1f} rps  p50 {case['p50_ms']:9.1f} ms  "
+              f"p99 {case['p99_ms']:9.1f} ms  errors {case['errors']}")
+
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if baseline:
+        regressed = compare(results, baseline, args.max_regression)
+        if regressed:
+            print(f"Regressed cases: {regressed}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUDIOS_COUNT = 20
+JIRA_ISSUE_ID = 10000
+
+
+def jira_issue(key):
+    # Even issue numbers are closed
+    number = int(key.rsplit('-', 1)[1])
+    return {'id': str(number), 'key': key, 'self': f"/rest/api/2/issue/{key}",
+            'fields': {'status': {'name': 'Closed' if number % 2 == 0 else 'Open'}}}
+
+
+def jira_search(match):
+    jql = parse_qs(urlparse(match.string).query).get('jql', [''])[0]
+    issues = [jira_issue(key) for key in re.findall(r'"([A-Z]+-\d+)"', jql)]
+    return {'startAt': 0, 'maxResults': len(issues), 'total': len(issues), 'issues': issues}
+
+
+def jira_create_issue(match):
+    global JIRA_ISSUE_ID
+    JIRA_ISSUE_ID += 1
+    key = f"JIRAP-{JIRA_ISSUE_ID}"
+    return {'id': str(JIRA_ISSUE_ID), 'key': key, 'self': f"/rest/api/2/issue/{key}"}
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for harp-environments, harp-users, harp-scenarios, harp-bridge, Jira and Loki
+    """
+    routes = [
+        ('GET', r'^/api/v1/environments/all$',
+         lambda match: {str(studio_id): f"Studio {studio_id}" for studio_id in range(1, STUDIOS_COUNT + 1)}),
+        ('GET', r'^/api/v1/users/user-info/(?P<username>[^/]+)$',
+         lambda match: {'user_id': 1, 'first_name': 'Bench', 'second_name': 'User', 'username': match['username']}),
+        ('GET', r'^/api/v1/users/user-info-by-id/(?P<user_id>\d+)$',
+         lambda match: {'user_id': int(match['user_id']), 'first_name': 'Bench', 'second_name': 'User', 'username': 'bench'}),
+        ('GET', r'^/harp-scenarios/api/v1/scenarios/(?P<scenario_id>\d+)$',
+         lambda match: {'msg': {'procedure_id': int(match['scenario_id']), 'procedure_details': {}}}),
+        ('POST', r'^/api/v1/bridge/force_update$', lambda match: {}),
+        ('GET', r'^/api/v1/bridge-actions/update_cache/\d+$', lambda match: {}),
+        ('POST', r'^/loki/api/v1/push$', lambda match: {}),
+        ('GET', r'^/jira/rest/api/2/serverInfo(\?.*)?$',
+         lambda match: {'version': '8.0.0', 'versionNumbers': [8, 0, 0], 'deploymentType': 'Server', 'serverTitle': 'Fake'}),
+        ('GET', r'^/jira/rest/api/2/search(\?.*)?$', jira_search),
+        ('POST', r'^/jira/rest/api/2/issue$', jira_create_issue),
+        ('GET', r'^/jira/rest/api/2/issue/(?P<key>[A-Z]+-\d+)(\?.*)?$', lambda match: jira_issue(match['key'])),
+        ('POST', r'^/jira/rest/api/2/issue/[A-Z]+-\d+/watchers$', lambda match: {}),
+        ('POST', r'^/jira/rest/api/2/issue/[A-Z]+-\d+/transitions(\?.*)?$', lambda match: {}),
+    ]
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        for route_method, pattern, handler in self.routes:
+            match = re.match(pattern, self.path)
+            if route_method == method and match:
+                body = json.dumps(handler(match)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_upstreams():
+    """
+    Starts fake upstream services in a background thread and points the service settings to them.
+    Must be called before anything from the actions package is imported.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{server.server_port}"
+    os.environ['ENVIRONMENTS_HOST'] = host
+    os.environ['USERS_HOST'] = host
+    os.environ['BRIDGE_HOST'] = host
+    os.environ['SCENARIOS_HOST'] = f"http://{host}/harp-scenarios/api/v1/scenarios"
+    os.environ['LOKI_SERVER'] = '127.0.0.1'
+    os.environ['LOKI_PORT'] = str(server.server_port)
+    os.environ['JIRA_SERVER'] = f"http://{host}/jira"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    return server
@@ -0,0 +1,67 @@
+"""
+Benchmark of history pattern search: LIKE scan against the trigram index.
+Needs a MySQL or MariaDB database configured with DBHOST, DBPORT, DBUSER, DBPASS and DBSCHEMA,
+the data is generated and indexed once. Both modes must return the same rows.
+
+    python -m benchmarks.history_search --rows 1000000
+"""
+import argparse
+import datetime
+import time
+from benchmarks.fakes import start_fake_upstreams
+
+start_fake_upstreams()
+
+from actions.app import app, config, update_studio_dict  # noqa: E402
+from actions.logic.db import db, Notifications, NotificationSearchTrigrams, search_index  # noqa: E402
+from actions.logic.migrations import run_migrations  # noqa: E402
+from benchmarks.synthetic import create_schema, populate_notifications  # noqa: E402
+
+
+def history_request(pattern):
+    now = datetime.datetime.utcnow()
+    return {
+        'environment_id': [], 'monitoring_system': '', 'scenario_id': '', 'service': '', 'source': '', 'name': '',
+        'object': '', 'pattern': pattern,
+        'from': (now - datetime.timedelta(days=60)).strftime('%Y-%m-%d %H:%M:%S'),
+        'to': now.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--patterns', nargs='+', default=['checkout', 'edis-42', 'payments latency', 'zz-no-match'])
+    args = parser.parse_args()
+
+    db.init_app(app)
+    db.app = app
+    update_studio_dict(config)
+    with app.app_context():
+        create_schema()
+        populate_notifications(args.rows)
+        run_migrations()
+        start_ts = time.time()
+        search_index.sync()
+        print(f"Index synced in {time.time() - start_ts:.1f} s, {NotificationSearchTrigrams.query.count()} trigram rows")
+
+        for pattern in args.patterns:
+            found = {}
+            for search_mode in ['like', 'trigram']:
+                Notifications.search_mode = search_mode
+                timings = []
+                for _ in range(args.repeat):
+                    start_ts = time.time()
+                    result = Notifications.history(history_request(pattern))
+                    timings.append(time.time() - start_ts)
+                    db.session.rollback()
+                found[search_mode] = [notification['notification_id'] for notification in result['notifications']]
+                print(f"{pattern!r:<22} {search_mode:<9} best {min(timings) * 1000:9.1f} ms  "
+                      f"rows {len(result['notifications'])}")
+            if found['like'] != found['trigram']:
+                raise SystemExit(f"Results of {pattern!r} differ between LIKE and trigram search")
+
+
+if __name__ == '__main__':
+    main()
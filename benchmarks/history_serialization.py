@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of per-row serialization cost in Notifications.history.
+
+    python -m benchmarks.history_serialization --rows 10000
+"""
+import argparse
+import datetime
+import json
+import timeit
+from collections import namedtuple
+from benchmarks.fakes import start_fake_upstreams
+
+start_fake_upstreams()
+
+from actions.app import config, update_studio_dict  # noqa: E402
+from actions.logic.db import Notifications  # noqa: E402
+
+
+def make_notification(obj_id):
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    return Notifications(
+        id=obj_id,
+        name=f"Alert {obj_id}",
+        studio=obj_id % 20 + 1,
+        ms='prometheus',
+        source=f"source-{obj_id % 100}",
+        object_name=f"object-{obj_id % 1000}",
+        service='service',
+        severity=obj_id % 4,
+        department=json.dumps([]),
+        output=json.dumps({'current': 'x' * 200, 'previous': 'y' * 200}),
+        additional_fields=json.dumps({f"field_{idx}": idx for idx in range(10)}),
+        additional_urls=json.dumps({'grafana': 'http://grafana.local/d/1'}),
+        actions=json.dumps({}),
+        description='',
+        recipient_id='',
+        assigned_to=json.dumps({}),
+        action_by=json.dumps({}),
+        total_duration=0,
+        notification_status=1,
+        assign_status=0,
+        snooze_expire_ts=datetime.datetime(1970, 1, 2),
+        sticky=0,
+        procedure_id=1,
+        last_update_ts=now,
+        last_create_ts=now
+    )
+
+
+def previous_row(notification, env_statistics):
+    row = {
+        'body': notification.json_self(),
+        'last_change_ts': str(notification.last_update_ts),
+        'notification_id': notification.id,
+        'panel_type': 'single_alert',
+        'notification_status': notification.notification_status
+    }
+    if notification.json_self()['studio_id'] in env_statistics:
+        env_statistics[notification.json_self()['studio_id']] += 1
+    else:
+        env_statistics[notification.json_self()['studio_id']] = 1
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    update_studio_dict(config)
+    notifications = [make_notification(obj_id) for obj_id in range(1, args.rows + 1)]
+    light_columns = [column.key for column in Notifications.history_light_columns()]
+    LightRow = namedtuple('LightRow', light_columns)
+    light_rows = [LightRow(*[getattr(notification, column) for column in light_columns]) for notification in notifications]
+
+    cases = {
+        'previous (json_self x4)': lambda: [previous_row(notification, {}) for notification in notifications],
+        'json_history (json_self x1)': lambda: [notification.json_history() for notification in notifications],
+        'json_history_light': lambda: [Notifications.json_history_light(row) for row in light_rows],
+    }
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(f"{name:<30} {best / args.rows * 1e6:10.2f} us/row")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+import datetime
+import json
+import random
+from sqlalchemy import UniqueConstraint
+from actions.logic.db import db, Notifications
+
+WORDS = ['api', 'gateway', 'mysql', 'redis', 'kafka', 'payments', 'checkout', 'login', 'cdn', 'search',
+         'billing', 'worker', 'scheduler', 'storage', 'queue', 'frontend', 'backend', 'cache', 'auth', 'lobby']
+MONITORING_SYSTEMS = ['prometheus', 'zabbix', 'nagios', 'grafana', 'pingdom']
+
+
+def create_schema():
+    """
+    Creates tables for benchmarks. Column level unique flags of notifications are dropped,
+    only the composite unique constraint is kept as in the production schema.
+    """
+    table = Notifications.__table__
+    for constraint in list(table.constraints):
+        if isinstance(constraint, UniqueConstraint) and len(constraint.columns) == 1:
+            table.constraints.discard(constraint)
+    db.create_all()
+
+
+def insert_in_chunks(model, rows, chunk_size=10000):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(model.__table__.insert(), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(model.__table__.insert(), chunk)
+        db.session.commit()
+
+
+def notification_rows(count, studios_count=20, start_id=1, days=30, seed=42):
+    rnd = random.Random(seed)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    for obj_id in range(start_id, start_id + count):
+        service, component = rnd.choice(WORDS), rnd.choice(WORDS)
+        created_ts = now - datetime.timedelta(seconds=rnd.randint(0, days * 86400))
+        yield {
+            'id': obj_id,
+            'name': f"{component} {rnd.choice(WORDS)} latency is high #{obj_id}",
+            'studio': rnd.randint(1, studios_count),
+            'ms': rnd.choice(MONITORING_SYSTEMS),
+            'source': f"{service}-{rnd.randint(1, 500)}.prod",
+            'object_name': f"{component}-{rnd.randint(1, 5000)}",
+            'service': service,
+            'severity': rnd.randint(0, 3),
+            'department': json.dumps([]),
+            'output': json.dumps({'current': f"value={rnd.random()}", 'previous': ''}),
+            'additional_fields': json.dumps({}),
+            'additional_urls': json.dumps({}),
+            'actions': json.dumps({}),
+            'description': '',
+            'ms_alert_id': str(obj_id),
+            'recipient_id': '',
+            'assigned_to': json.dumps({}),
+            'action_by': json.dumps({}),
+            'total_duration': 0,
+            'notification_status': rnd.choice([0, 0, 0, 1, 2]),
+            'assign_status': 0,
+            'snooze_expire_ts': datetime.datetime(1970, 1, 1, 0, 0, 1),
+            'sticky': 0,
+            'procedure_id': rnd.randint(1, 1000),
+            'last_update_ts': created_ts + datetime.timedelta(seconds=rnd.randint(0, 3600)),
+            'last_create_ts': created_ts
+        }
+
+
+def populate_notifications(count):
+    existing = db.session.query(db.func.count(Notifications.id)).scalar()
+    if existing < count:
+        insert_in_chunks(Notifications, notification_rows(count - existing, start_id=existing + 1))
+
+
+def notification_history_rows(alerts_count, events_per_alert, days=120, seed=42):
+    rnd = random.Random(seed)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    actions = ['Create alert', 'Update alert', 'Snooze alert', 'Acknowledge', 'Resolve alert']
+    for alert_id in range(1, alerts_count + 1):
+        for _ in range(events_per_alert):
+            with_comment = rnd.random() < 0.1
+            yield {
+                'alert_id': alert_id,
+                'notification_output': 'x' * rnd.randint(50, 2000),
+                'notification_action': rnd.choice(actions),
+                'comments': json.dumps({'author': 'bench', 'comment': 'synthetic'}) if with_comment else None,
+                'time_stamp': now - datetime.timedelta(seconds=rnd.randint(0, days * 86400))
+            }
+
+
+def actions_history_rows(alerts_count, actions_per_alert, seed=42):
+    rnd = random.Random(seed)
+    for alert_id in range(1, alerts_count + 1):
+        for _ in range(actions_per_alert):
+            yield {
+                'name': rnd.choice(['Snooze alert', 'Acknowledge alert', 'Resolving alert']),
+                'obj_type': 'alert',
+                'obj_id': alert_id,
+                'username': 'bench',
+                'notes': '',
+                'created_ts': datetime.datetime.utcnow()
+            }
+
+
+def active_alert_rows(alerts_count, active_share=0.2, studios_count=20, seed=42):
+    """
+    Active alerts for a share of notifications, ids match notification_rows with the same seed
+    """
+    rnd = random.Random(seed)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    for alert_id in range(1, alerts_count + 1):
+        if rnd.random() >= active_share:
+            continue
+        service, component = rnd.choice(WORDS), rnd.choice(WORDS)
+        yield {
+            'alert_id': alert_id,
+            'alert_name': f"{component} {rnd.choice(WORDS)} latency is high #{alert_id}",
+            'studio': rnd.randint(1, studios_count),
+            'ms': rnd.choice(MONITORING_SYSTEMS),
+            'source': f"{service}-{rnd.randint(1, 500)}.prod",
+            'service': service,
+            'object_name': f"{component}-{rnd.randint(1, 5000)}",
+            'severity': rnd.randint(0, 3),
+            'notification_type': 1,
+            'department': json.dumps([]),
+            'additional_fields': json.dumps({}),
+            'ms_alert_id': str(alert_id),
+            'assigned_to': json.dumps({}),
+            'action_by': json.dumps({}),
+            'created_ts': now - datetime.timedelta(seconds=rnd.randint(0, 7 * 86400))
+        }
+
+
+def statistics_rows(alerts_count, seed=42):
+    rnd = random.Random(seed)
+    for alert_id in range(1, alerts_count + 1):
+        yield {
+            'alert_id': alert_id,
+            'close': rnd.randint(0, 20),
+            'create': rnd.randint(1, 20),
+            'reopen': rnd.randint(0, 5),
+            'update': rnd.randint(0, 200),
+            'change_severity': rnd.randint(0, 10),
+            'snooze': rnd.randint(0, 5),
+            'acknowledge': rnd.randint(0, 5),
+            'assign': rnd.randint(0, 2)
+        }
+
+
+def procedure_rows(count, studios_count=20, seed=42):
+    rnd = random.Random(seed)
+    for obj_id in range(1, count + 1):
+        yield {
+            'id': obj_id,
+            'name': f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} runbook #{obj_id}",
+            'studio_id': rnd.randint(1, studios_count),
+            'description': 'synthetic procedure',
+            'wiki': '',
+            'requested_by': 'bench',
+            'thresholds': json.dumps([]),
+            'tags': json.dumps(rnd.sample(WORDS, 2)),
+            'procedure_type': rnd.randint(0, 3),
+            'alert_fields': json.dumps({}),
+            'jira_fields': json.dumps({}),
+            'email_fields': json.dumps({}),
+            'skype_fields': json.dumps({}),
+            'teams_fields': json.dumps({}),
+            'telegram_fields': json.dumps({}),
+            'pagerduty_fields': json.dumps({}),
+            'sms_fields': json.dumps({}),
+            'voice_fields': json.dumps({}),
+            'whatsapp_fields': json.dumps({})
+        }
+
+
+def storage_rows(count, types_count=100):
+    for idx in range(count):
+        item_type = 'tags' if idx % types_count == 0 else f"type-{idx % types_count}"
+        yield {'item_type': item_type, 'item_value': f"value-{idx}", 'added_by': 'bench'}
+
+
+def populate_table(model, rows_factory, probe_column):
+    """
+    Fills the table with generated rows if it is empty
+    """
+    if not db.session.query(probe_column).first():
+        insert_in_chunks(model, rows_factory())
@@ -20,11 +20,14 @@ setup(
         'Programming Language :: Python :: 3.9',
     ],
     keywords=[],
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
     install_requires=requirements,
     tests_require=tests_require,
     entry_points={
-        'console_scripts': ['harp-actions = actions.app:main']
+        'console_scripts': [
+            'harp-actions = actions.app:main',
+            'harp-actions-migrate = actions.logic.migrations:main'
+        ]
     },
     zip_safe=False,
     cmdclass={}
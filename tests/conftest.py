@@ -0,0 +1,50 @@
+"""
+Database tests run against a MySQL or MariaDB schema configured with DBHOST, DBPORT, DBUSER, DBPASS and DBSCHEMA
+and are skipped when DBHOST is not set. Use a scratch schema, tables are created and filled with synthetic data.
+"""
+import os
+import pytest
+
+DATABASE_CONFIGURED = bool(os.getenv('DBHOST'))
+ALERTS = 5000
+
+if DATABASE_CONFIGURED:
+    # Settings are read on import, upstreams must be running before the actions package is loaded
+    from benchmarks.fakes import start_fake_upstreams
+    start_fake_upstreams()
+
+
+@pytest.fixture(scope='session')
+def database():
+    if not DATABASE_CONFIGURED:
+        pytest.skip('No test database, set DBHOST, DBPORT, DBUSER, DBPASS and DBSCHEMA')
+    pytest.importorskip('flask_sqlalchemy')
+    pytest.importorskip('pymysql')
+    from actions.app import app, config, init_database, prepare_database, update_studio_dict
+    from actions.logic.db import db, NotificationHistory, Storage, search_index
+    from benchmarks import synthetic
+
+    init_database()
+    update_studio_dict(config)
+    with app.app_context():
+        synthetic.create_schema()
+        prepare_database()
+        synthetic.populate_notifications(ALERTS)
+        synthetic.populate_table(
+            NotificationHistory, lambda: synthetic.notification_history_rows(ALERTS, 5), NotificationHistory.id
+        )
+        synthetic.populate_table(Storage, lambda: synthetic.storage_rows(3000), Storage.id)
+        search_index.sync()
+        db.session.execute(db.text(
+            "ANALYZE TABLE notifications, notification_history, notification_search_trigrams, storage"
+        ))
+        db.session.commit()
+    return db
+
+
+@pytest.fixture
+def app_context(database):
+    from actions.app import app
+    with app.app_context():
+        yield
+        database.session.rollback()
@@ -0,0 +1,83 @@
+import random
+import pytest
+
+prometheus_client = pytest.importorskip('prometheus_client')
+
+from prometheus_client import CollectorRegistry, Histogram, REGISTRY  # noqa: E402
+from actions.tools.action_metrics import ActionMetrics, BoundedLabel, TopKTracker, OTHER  # noqa: E402
+
+ACTIONS = [
+    'Adding comment', 'Add description', 'Resolve alert', 'Snooze alert', 'Cancel snooze', 'Handle alert',
+    'Cancel handling', 'Acknowledge alert', 'Cancel acknowledge', 'Assign alert'
+]
+USERS = [f"user-{user}" for user in range(5000)] + ['me_auto']
+METRICS = ['actions', 'action_duration_seconds', 'hot_alert_actions']
+
+
+def count_series(*registries):
+    series = {name: set() for name in METRICS}
+    for registry in registries:
+        for family in registry.collect():
+            if family.name in series:
+                for sample in family.samples:
+                    series[family.name].add((sample.name, tuple(sorted(sample.labels.items()))))
+    return {name: len(samples) for name, samples in series.items()}
+
+
+def test_bounded_label_reports_other_above_limit():
+    label = BoundedLabel(2)
+    assert [label(value) for value in (1, 2, 3, 1)] == ['1', '2', OTHER, '1']
+
+
+def test_top_k_tracker_keeps_k_keys():
+    tracker = TopKTracker(2)
+    for key in ['a', 'a', 'a', 'b', 'c']:
+        tracker.add(key)
+    assert len(tracker) == 2
+    assert tracker.top()[0] == ('a', 3)
+
+
+def synthetic_actions(rnd, amount, alerts, studios):
+    """
+    Label tuples of random actions, generated per batch to keep a million of them cheap
+    """
+    actions = rnd.choices(ACTIONS, k=amount)
+    users = rnd.choices(USERS, k=amount)
+    for action, username in zip(actions, users):
+        # Skewed towards a few noisy alerts like real traffic
+        yield action, username, int(rnd.paretovariate(1.2)) % alerts, rnd.randrange(studios)
+
+
+def test_action_metrics_series_are_bounded():
+    """
+    A million synthetic actions over random alerts, studios and users must not grow series above the label limits
+    """
+    rnd = random.Random(42)
+    alerts, studios, max_studios, top_k = 200000, 500, 50, 20
+    metrics = ActionMetrics(max_studios=max_studios, system_users=['me_auto'], top_k=top_k)
+    hot_registry = CollectorRegistry()
+    metrics.register(hot_registry)
+    timed = {action: metrics.timed(action)(lambda: None) for action in ACTIONS}
+
+    def run(amount, with_latency):
+        for action, username, alert_id, studio in synthetic_actions(rnd, amount, alerts, studios):
+            metrics.record(action, username, {alert_id: studio})
+            if with_latency:
+                timed[action]()
+
+    def assert_bounded(series):
+        # Counter exports _total and _created per label set, histogram exports its buckets, _count, _sum and _created
+        assert series['actions'] <= len(ACTIONS) * (max_studios + 1) * 2 * 2
+        assert series['action_duration_seconds'] <= len(ACTIONS) * (len(Histogram.DEFAULT_BUCKETS) + 3)
+        assert series['hot_alert_actions'] == top_k
+
+    run(100000, with_latency=True)
+    first = count_series(REGISTRY, hot_registry)
+    assert_bounded(first)
+
+    # Latency series are labeled by action only and every action was timed, the rest records actions only
+    run(900000, with_latency=False)
+    series = count_series(REGISTRY, hot_registry)
+    assert_bounded(series)
+    # Rare label sets (system users on labeled studios) may still appear, hot alerts are already flat
+    assert series['hot_alert_actions'] == first['hot_alert_actions']
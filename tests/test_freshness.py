@@ -0,0 +1,72 @@
+"""
+Read helpers return fresh rows without committing the session: every object is loaded in the test session,
+changed and committed through a separate connection, then read again by the helper.
+"""
+import datetime
+import pytest
+
+ALERT_ID = 1
+
+# Helper reading the value, model and column changed by another connection
+CASES = {
+    'Notifications.get_notification_by_id': (
+        lambda models: models.Notifications.get_notification_by_id(ALERT_ID)[0].description,
+        'Notifications', 'description'
+    ),
+    'ActiveAlerts.get_active_event_by_id': (
+        lambda models: models.ActiveAlerts.get_active_event_by_id(ALERT_ID)[0].acknowledged,
+        'ActiveAlerts', 'acknowledged'
+    ),
+    'Statistics.get_counter': (
+        lambda models: models.Statistics.get_counter(ALERT_ID).snooze,
+        'Statistics', 'snooze'
+    ),
+    'Assign.get_assign_info': (
+        lambda models: models.Assign.get_assign_info(ALERT_ID)[0].description,
+        'Assign', 'description'
+    ),
+}
+
+
+def update_row(database, model, column, value):
+    table = model.__table__
+    key = table.c.alert_id if 'alert_id' in table.c else table.c.id
+    with database.engine.begin() as connection:
+        connection.execute(table.update().where(key == ALERT_ID).values({column: value}))
+
+
+@pytest.fixture
+def rows(database, app_context):
+    from actions.logic.db import ActiveAlerts, Statistics, Assign
+    with database.engine.begin() as connection:
+        for model in [ActiveAlerts, Statistics, Assign]:
+            connection.execute(model.__table__.delete().where(model.__table__.c.alert_id == ALERT_ID))
+        connection.execute(ActiveAlerts.__table__.insert().values(
+            alert_id=ALERT_ID, alert_name='freshness', studio=1, ms='prometheus', source='source', service='service',
+            object_name='object', severity=1, notification_type=1, acknowledged=0
+        ))
+        connection.execute(Statistics.__table__.insert().values(alert_id=ALERT_ID, snooze=0))
+        connection.execute(Assign.__table__.insert().values(
+            alert_id=ALERT_ID, notification_type=1, notification_fields='{}', description='0',
+            time_to=datetime.datetime.utcnow()
+        ))
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_read_helper_returns_fresh_rows(database, rows, name):
+    from actions.logic import db as models
+    read, model_name, column = CASES[name]
+
+    # The first read loads the object into the identity map and starts the transaction
+    read(models)
+    for value in range(1, 4):
+        update_row(database, getattr(models, model_name), column, value)
+        assert str(read(models)) == str(value)
+
+
+def test_fresh_read_after_default_transaction(database, rows):
+    from actions.logic.db import Statistics
+    # A plain query starts the transaction with the default isolation level and takes its snapshot
+    Statistics.query.filter_by(alert_id=ALERT_ID).one()
+    update_row(database, Statistics, 'snooze', 5)
+    assert Statistics.get_counter(ALERT_ID).snooze == 5
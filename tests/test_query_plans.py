@@ -0,0 +1,110 @@
+"""
+EXPLAIN of the statements which hot model methods actually run: every access to a listed table
+must use one of the expected indexes, a full scan or another index fails the test.
+"""
+import datetime
+import re
+from contextlib import contextmanager
+import pytest
+
+HISTORY_INDEX = 'ix_notification_history_alert_id_time_stamp'
+TRIGRAM_INDEXES = {'ix_notification_search_trigrams_trigram_notification_id', 'ix_notification_search_trigrams_notification_id'}
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+@contextmanager
+def captured_selects():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', capture)
+
+
+def explain(db, statement, parameters):
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN {statement}", parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def history_request(days=1, **kwargs):
+    now = datetime.datetime.utcnow()
+    data = {
+        'environment_id': [], 'notification_type': [], 'monitoring_system': '', 'scenario_id': '', 'service': '',
+        'source': '', 'name': '', 'object': '', 'pattern': '', 'page_size': 100,
+        'from': (now - datetime.timedelta(days=days)).strftime(DATE_FORMAT), 'to': now.strftime(DATE_FORMAT)
+    }
+    data.update(kwargs)
+    return data
+
+
+def history_pages(models, data):
+    first_page = models.Notifications.history(data)
+    if first_page['next_cursor']:
+        models.Notifications.history(dict(data, cursor=first_page['next_cursor']))
+
+
+# Name: (call of the model method with the models module, allowed indexes by table)
+CASES = {
+    'NotificationHistory.history': (
+        lambda models: models.NotificationHistory.history(42),
+        {'notification_history': {HISTORY_INDEX, 'PRIMARY'}}
+    ),
+    'NotificationHistory.timeline': (
+        lambda models: models.NotificationHistory.timeline(list(range(1, 51)), history_request(days=30)),
+        {'notification_history': {HISTORY_INDEX, 'PRIMARY'}, 'notifications': {'PRIMARY'}}
+    ),
+    'Notifications.active_notifications_for_source': (
+        lambda models: models.Notifications.active_notifications_for_source('redis-42.prod'),
+        {'notifications': {'ix_notifications_source_notification_status'}}
+    ),
+    'Notifications.active_notifications_for_object': (
+        lambda models: models.Notifications.active_notifications_for_object('cache-42'),
+        {'notifications': {'ix_notifications_object_name_notification_status'}}
+    ),
+    'Notifications.history': (
+        lambda models: history_pages(models, history_request()),
+        {'notifications': {'ix_notifications_last_update_ts_id'}}
+    ),
+    'Notifications.history with pattern': (
+        lambda models: history_pages(models, history_request(pattern='edis-42')),
+        {'notifications': {'ix_notifications_last_update_ts_id', 'PRIMARY'}, 'notification_search_trigrams': TRIGRAM_INDEXES}
+    ),
+    'Storage.values_by_type': (
+        lambda models: models.Storage.values_by_type('tags'),
+        {'storage': {'ix_storage_item_type'}}
+    ),
+}
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_hot_query_uses_index(database, app_context, monkeypatch, name):
+    from actions.logic import db as models
+    # Lookups must go to the database instead of the in-memory index
+    monkeypatch.setattr(models.active_notifications_index, 'ready', False)
+    monkeypatch.setattr(models.Notifications, 'search_mode', 'trigram')
+    run, expected_keys = CASES[name]
+
+    with captured_selects() as statements:
+        run(models)
+    assert statements, f"{name} didn't query the database"
+
+    for statement, parameters in statements:
+        for row in explain(database, statement, parameters):
+            # Aliases of a table get a numeric suffix, derived tables and subqueries are not checked
+            table = re.sub(r'_\d+$', '', row.get('table') or '')
+            if table in expected_keys:
+                assert row.get('key') in expected_keys[table], \
+                    f"{name} reads {table} with {row.get('type')} over {row.get('key')}: {statement}"
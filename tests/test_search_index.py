@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from actions.logic.search_index import trigrams, pattern_trigrams  # noqa: E402
+
+
+def test_trigrams_of_value():
+    assert trigrams('redis-42') == {'red', 'edi', 'dis', 'is-', 's-4', '-42'}
+    assert trigrams('ab') == set()
+    assert trigrams(None) == set()
+
+
+def test_pattern_trigrams_skip_like_wildcards():
+    # Wildcards match any character, only literal parts of the pattern give trigrams
+    assert pattern_trigrams('ckout%ency') == ['cko', 'kou', 'out', 'enc', 'ncy']
+    assert pattern_trigrams('a_ix') == []
+    assert pattern_trigrams('50\\%') == []
+
+
+def test_pattern_trigrams_are_contained_in_matching_values():
+    value = 'payments latency is high'
+    for pattern in ['payments lat', 'ency is', 'ts%high']:
+        assert set(pattern_trigrams(pattern)) <= trigrams(value)